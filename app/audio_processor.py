@@ -5,23 +5,64 @@ Comprehensive feature extraction for AI/Human voice detection
 
 import numpy as np
 import librosa
+import scipy.fft
+import soxr
+import soundfile as sf
 import io
-from typing import Tuple, Optional
+import shutil
+import subprocess
+from functools import lru_cache
+from typing import List, Tuple, Optional
 import logging
 
+from .features_numba import pitch_stats, rel_diff_mean, row_mean_std, voiced_pitch
+
 logger = logging.getLogger(__name__)
 
 
+def _mean_std(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean and (population) std over the last axis (numba row reduction)"""
+    rows = np.ascontiguousarray(x.reshape(-1, x.shape[-1]))
+    mean, std = row_mean_std(rows)
+    return mean.reshape(x.shape[:-1]), std.reshape(x.shape[:-1])
+
+
+@lru_cache(maxsize=256)
+def _chroma_filters(sr: int, n_fft: int, tuning: float) -> np.ndarray:
+    """Chroma filterbank; tuning is estimated per signal at 0.01-bin resolution"""
+    return librosa.filters.chroma(sr=sr, n_fft=n_fft, tuning=tuning)
+
+
 class AudioProcessor:
     """
     Complete audio processing pipeline with feature extraction
     Based on TECHNICAL_GUIDE specifications
     """
     
-    def __init__(self, target_sr: int = 22050):
+    def __init__(self, target_sr: int = 22050, fft_workers: int = 1):
         self.target_sr = target_sr
         self.min_duration = 1.0
         self.max_duration = 60.0
+        
+        # STFT parameters shared by every spectral extractor (librosa defaults)
+        self.n_fft = 2048
+        self.hop_length = 512
+        # scipy.fft threads per STFT (ignores OMP_NUM_THREADS). 1 by default:
+        # parallelism comes from the extraction process pool, one core each
+        self.fft_workers = fft_workers
+        
+        # Fixed for target_sr/n_fft, so built once instead of on every request
+        self._window = librosa.filters.get_window("hann", self.n_fft).astype(np.float32)
+        self._mel_basis = librosa.filters.mel(sr=target_sr, n_fft=self.n_fft)
+        # Orthonormal DCT-II rows for the first 40 MFCCs of the 128 mel bands,
+        # so MFCCs are a single matmul (same values as librosa.feature.mfcc)
+        self._dct_basis = scipy.fft.dct(
+            np.eye(self._mel_basis.shape[0], dtype=np.float32), type=2, norm='ortho', axis=0
+        )[:40]
+        
+        # ffmpeg decodes + resamples in one native pass for formats libsndfile lacks
+        self._ffmpeg = shutil.which("ffmpeg")
+        self.decode_timeout = 30.0
     
     def preprocess(self, audio_bytes: bytes) -> Tuple[np.ndarray, int, float]:
         """
@@ -32,12 +73,7 @@ class AudioProcessor:
             sr: Sample rate
             duration: Audio duration in seconds
         """
-        # Load audio from bytes - librosa handles MP3, WAV, OGG, etc.
-        audio, sr = librosa.load(
-            io.BytesIO(audio_bytes),
-            sr=self.target_sr,
-            mono=True
-        )
+        audio, sr = self._load_audio(audio_bytes)
         
         # Calculate duration
         duration = librosa.get_duration(y=audio, sr=sr)
@@ -49,60 +85,235 @@ class AudioProcessor:
             raise ValueError(f"Audio too long: {duration:.2f}s (max: {self.max_duration}s)")
         
         # Normalize amplitude
-        audio = librosa.util.normalize(audio)
+        audio = librosa.util.normalize(audio).astype(np.float32, copy=False)
         
         # Remove leading/trailing silence
         audio, _ = librosa.effects.trim(audio, top_db=30)
         
         return audio, sr, duration
     
+    def _load_audio(self, audio_bytes: bytes) -> Tuple[np.ndarray, int]:
+        """
+        Decode to mono float32 at target_sr
+        
+        libsndfile decodes WAV/FLAC/OGG/MP3 in-process. Anything else
+        (AAC, WebM, ...) goes through an ffmpeg pipe instead of librosa's
+        audioread fallback, which decodes frame by frame in Python.
+        """
+        try:
+            audio, sr = sf.read(io.BytesIO(audio_bytes), dtype='float32')
+        except RuntimeError:
+            if self._ffmpeg:
+                audio = self._decode_ffmpeg(audio_bytes)
+                if audio is not None:
+                    return audio, self.target_sr
+            
+            # Last resort: librosa/audioread
+            audio, sr = librosa.load(
+                io.BytesIO(audio_bytes),
+                sr=None,
+                mono=True,
+                dtype=np.float32
+            )
+        
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+        if sr != self.target_sr:
+            # soxr directly (librosa's default resampler, minus its wrapper)
+            audio = soxr.resample(
+                np.ascontiguousarray(audio, dtype=np.float32), sr, self.target_sr, quality='HQ'
+            )
+        
+        return audio, self.target_sr
+    
+    def _decode_ffmpeg(self, audio_bytes: bytes) -> Optional[np.ndarray]:
+        """
+        Pipe the upload through ffmpeg into raw f32le PCM
+        
+        Returns None if ffmpeg fails so the caller can fall back to librosa.
+        """
+        cmd = [
+            self._ffmpeg, "-v", "quiet",
+            "-i", "pipe:0",
+            "-f", "f32le", "-ac", "1", "-ar", str(self.target_sr),
+            "pipe:1"
+        ]
+        try:
+            result = subprocess.run(
+                cmd,
+                input=audio_bytes,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=self.decode_timeout
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"ffmpeg decode failed, falling back to librosa: {e}")
+            return None
+        
+        if result.returncode != 0 or not result.stdout:
+            logger.debug(f"ffmpeg exited with code {result.returncode}, falling back to librosa")
+            return None
+        
+        return np.frombuffer(result.stdout, dtype=np.float32)
+    
     def extract_all_features(self, audio: np.ndarray, sr: int) -> np.ndarray:
         """
         Extract comprehensive features for voice detection
         Total: ~113 features
+        
+        The STFT is computed once here and shared by every spectral
+        extractor instead of each librosa call recomputing it.
+        """
+        # float32 end-to-end halves the bytes moved through the spectrograms
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        
+        # Shared spectrograms
+        S, S_power, mel_db = self._spectral_front_end(audio, sr)
+        
+        return self._features_from_spectrograms(audio, sr, S, S_power, mel_db)
+    
+    def extract_features_batch(self, audios: List[np.ndarray], sr: int) -> np.ndarray:
         """
-        features = []
+        Extract features for several signals with one batched STFT
         
-        # 1. MFCC Features (80 features)
-        mfcc_features = self._extract_mfcc_features(audio, sr)
-        features.extend(mfcc_features)
+        Signals are zero-padded to the longest one. The STFT already pads
+        with zeros (librosa's constant pad mode), so every frame within a
+        signal's own length matches the unbatched result.
         
-        # 2. Spectral Features (10 features)
-        spectral_features = self._extract_spectral_features(audio, sr)
-        features.extend(spectral_features)
+        Returns:
+            (n_signals, n_features) float32 matrix
+        """
+        audios = [np.ascontiguousarray(audio, dtype=np.float32) for audio in audios]
+        lengths = [len(audio) for audio in audios]
         
-        # 3. Prosodic Features (6 features)
-        prosodic_features = self._extract_prosodic_features(audio, sr)
-        features.extend(prosodic_features)
+        batch = np.zeros((len(audios), max(lengths)), dtype=np.float32)
+        for i, audio in enumerate(audios):
+            batch[i, :len(audio)] = audio
         
-        # 4. Voice Quality Features (3 features)
-        voice_quality = self._extract_voice_quality_features(audio, sr)
-        features.extend(voice_quality)
+        S_batch, S_power_batch, mel_batch = self._spectral_front_end_batch(batch, sr)
         
-        # 5. Temporal Features (4 features)
-        temporal_features = self._extract_temporal_features(audio, sr)
-        features.extend(temporal_features)
+        rows = []
+        for i, (audio, length) in enumerate(zip(audios, lengths)):
+            n_frames = 1 + length // self.hop_length
+            S = S_batch[i, :, :n_frames]
+            S_power = S_power_batch[i, :, :n_frames]
+            mel_db = librosa.power_to_db(mel_batch[i, :, :n_frames])
+            rows.append(self._features_from_spectrograms(audio, sr, S, S_power, mel_db))
         
-        # 6. Chroma Features (24 features)
-        chroma_features = self._extract_chroma_features(audio, sr)
-        features.extend(chroma_features)
+        return np.stack(rows)
+    
+    def _features_from_spectrograms(
+        self,
+        audio: np.ndarray,
+        sr: int,
+        S: np.ndarray,
+        S_power: np.ndarray,
+        mel_db: np.ndarray
+    ) -> np.ndarray:
+        """Assemble the feature vector from one signal and its shared spectrograms"""
+        pitch_values = self._pitch_values(audio, sr, S=S)
+        
+        parts = [
+            # 1. MFCC Features (80 features)
+            self._extract_mfcc_features(audio, sr, mel_db=mel_db),
+            # 2. Spectral Features (10 features)
+            self._extract_spectral_features(audio, sr, S=S),
+            # 3. Prosodic Features (6 features)
+            self._extract_prosodic_features(audio, sr, pitch_values=pitch_values),
+            # 4. Voice Quality Features (3 features)
+            self._extract_voice_quality_features(audio, sr, pitch_values=pitch_values),
+            # 5. Temporal Features (4 features)
+            self._extract_temporal_features(audio, sr, mel_db=mel_db),
+            # 6. Chroma Features (24 features)
+            self._extract_chroma_features(audio, sr, S_power=S_power),
+        ]
         
-        return np.array(features, dtype=np.float32)
+        return np.concatenate(parts).astype(np.float32, copy=False)
+    
+    def _spectral_front_end(
+        self, audio: np.ndarray, sr: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Magnitude STFT, power STFT and log-mel spectrogram for one signal"""
+        S, S_power, mel = self._spectral_front_end_batch(audio[np.newaxis], sr)
+        return S[0], S_power[0], librosa.power_to_db(mel[0])
+    
+    def _spectral_front_end_batch(
+        self, batch: np.ndarray, sr: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Magnitude STFT, power STFT and mel power spectrogram for a (B, T) batch
+        Each output has shape (B, n_bins, n_frames)
+        """
+        D = self._stft(batch)
+        # |D|^2 straight from the real/imag parts, without a complex abs()
+        S_power = np.square(D.real)
+        S_power += np.square(D.imag)
+        S = np.sqrt(S_power)
+        mel = self._mel_filters(sr) @ S_power
+        return S, S_power, mel
     
-    def _extract_mfcc_features(self, audio: np.ndarray, sr: int) -> list:
+    def _stft(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Centered STFT over the last axis, shape (..., n_bins, n_frames)
+        
+        Same framing as librosa.stft (zero padding, periodic Hann window),
+        with the real FFT done by scipy.fft (fft_workers threads).
+        """
+        pad = [(0, 0)] * (audio.ndim - 1) + [(self.n_fft // 2, self.n_fft // 2)]
+        padded = np.pad(audio, pad, mode="constant")
+        frames = librosa.util.frame(
+            padded, frame_length=self.n_fft, hop_length=self.hop_length
+        )
+        return scipy.fft.rfft(frames * self._window[:, np.newaxis], axis=-2, workers=self.fft_workers)
+    
+    def _magnitude_spectrogram(self, audio: np.ndarray) -> np.ndarray:
+        """Magnitude STFT shared by all spectral extractors"""
+        return np.abs(self._stft(audio))
+    
+    def _mel_filters(self, sr: int) -> np.ndarray:
+        """Mel filterbank (128 bands); precomputed for target_sr"""
+        if sr == self.target_sr:
+            return self._mel_basis
+        return librosa.filters.mel(sr=sr, n_fft=self.n_fft)
+    
+    def _mel_db(self, S_power: np.ndarray, sr: int) -> np.ndarray:
+        """Log-power mel spectrogram (input to MFCC and onset strength)"""
+        return librosa.power_to_db(self._mel_filters(sr) @ S_power)
+    
+    def _pitch_values(
+        self, audio: np.ndarray, sr: int, S: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Per-frame pitch track (strongest piptrack bin per frame, voiced only)
+        Shared by the prosodic and voice quality extractors
+        """
+        if S is None:
+            S = self._magnitude_spectrogram(audio)
+        pitches, magnitudes = librosa.piptrack(S=S, sr=sr)
+        
+        # Strongest bin per frame, keeping voiced frames, in one numba pass
+        return voiced_pitch(pitches, magnitudes)
+    
+    def _extract_mfcc_features(
+        self, audio: np.ndarray, sr: int, mel_db: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
         Extract MFCC features (80 features)
         - 40 MFCC coefficients (mean)
         - 40 MFCC coefficients (std)
         """
-        mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=40)
+        if mel_db is None:
+            mel_db = self._mel_db(self._magnitude_spectrogram(audio) ** 2, sr)
+        
+        mfccs = self._dct_basis @ mel_db
         
-        mfcc_mean = np.mean(mfccs, axis=1)
-        mfcc_std = np.std(mfccs, axis=1)
+        mfcc_mean, mfcc_std = _mean_std(mfccs)
         
-        return list(np.concatenate([mfcc_mean, mfcc_std]))
+        return np.concatenate([mfcc_mean, mfcc_std])
     
-    def _extract_spectral_features(self, audio: np.ndarray, sr: int) -> list:
+    def _extract_spectral_features(
+        self, audio: np.ndarray, sr: int, S: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
         Extract spectral features (10 features)
         - Spectral centroid (mean, std)
@@ -111,145 +322,214 @@ class AudioProcessor:
         - Spectral contrast (mean, std)
         - Spectral flatness (mean, std)
         """
+        if S is None:
+            S = self._magnitude_spectrogram(audio)
+        
         # Spectral Centroid
-        centroid = librosa.feature.spectral_centroid(y=audio, sr=sr)[0]
+        centroid = librosa.feature.spectral_centroid(S=S, sr=sr)[0]
         
         # Spectral Rolloff
-        rolloff = librosa.feature.spectral_rolloff(y=audio, sr=sr)[0]
+        rolloff = librosa.feature.spectral_rolloff(S=S, sr=sr)[0]
         
         # Spectral Bandwidth
-        bandwidth = librosa.feature.spectral_bandwidth(y=audio, sr=sr)[0]
+        bandwidth = librosa.feature.spectral_bandwidth(S=S, sr=sr)[0]
         
         # Spectral Contrast
-        contrast = librosa.feature.spectral_contrast(y=audio, sr=sr)
+        contrast = librosa.feature.spectral_contrast(S=S, sr=sr)
         
         # Spectral Flatness
-        flatness = librosa.feature.spectral_flatness(y=audio)[0]
-        
-        return [
-            np.mean(centroid), np.std(centroid),
-            np.mean(rolloff), np.std(rolloff),
-            np.mean(bandwidth), np.std(bandwidth),
-            np.mean(contrast), np.std(contrast),
-            np.mean(flatness), np.std(flatness)
-        ]
+        flatness = librosa.feature.spectral_flatness(S=S)[0]
+        
+        return np.array([
+            *_mean_std(centroid),
+            *_mean_std(rolloff),
+            *_mean_std(bandwidth),
+            *_mean_std(contrast.ravel()),
+            *_mean_std(flatness)
+        ], dtype=np.float32)
     
-    def _extract_prosodic_features(self, audio: np.ndarray, sr: int) -> list:
+    def _extract_prosodic_features(
+        self, audio: np.ndarray, sr: int, pitch_values: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
         Extract prosodic features (6 features)
         - Pitch (mean, std, range)
         - Energy (mean, std)
         - Zero-crossing rate (mean)
         """
-        # Pitch extraction using piptrack
-        pitches, magnitudes = librosa.piptrack(y=audio, sr=sr)
-        
-        pitch_values = []
-        for t in range(pitches.shape[1]):
-            index = magnitudes[:, t].argmax()
-            pitch = pitches[index, t]
-            if pitch > 0:
-                pitch_values.append(pitch)
-        
-        if pitch_values:
-            pitch_mean = np.mean(pitch_values)
-            pitch_std = np.std(pitch_values)
-            pitch_range = np.ptp(pitch_values)
-        else:
-            pitch_mean = pitch_std = pitch_range = 0.0
+        if pitch_values is None:
+            pitch_values = self._pitch_values(audio, sr)
+        
+        # All zeros when no frame is voiced
+        pitch_mean, pitch_std, pitch_range = pitch_stats(pitch_values)
         
         # Energy/RMS
         rms = librosa.feature.rms(y=audio)[0]
-        energy_mean = np.mean(rms)
-        energy_std = np.std(rms)
+        energy_mean, energy_std = _mean_std(rms)
         
         # Zero-crossing rate
         zcr = librosa.feature.zero_crossing_rate(audio)[0]
         zcr_mean = np.mean(zcr)
         
-        return [pitch_mean, pitch_std, pitch_range, energy_mean, energy_std, zcr_mean]
+        return np.array(
+            [pitch_mean, pitch_std, pitch_range, energy_mean, energy_std, zcr_mean],
+            dtype=np.float32
+        )
     
-    def _extract_voice_quality_features(self, audio: np.ndarray, sr: int) -> list:
+    def _extract_voice_quality_features(
+        self, audio: np.ndarray, sr: int, pitch_values: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
         Extract voice quality features (3 features)
         - Jitter (pitch perturbation)
         - Shimmer (amplitude perturbation)
         - Harmonic-to-Noise Ratio (HNR)
         """
+        if pitch_values is None:
+            pitch_values = self._pitch_values(audio, sr)
+        
         # Jitter approximation
-        pitches, magnitudes = librosa.piptrack(y=audio, sr=sr)
-        pitch_values = []
-        for t in range(pitches.shape[1]):
-            index = magnitudes[:, t].argmax()
-            pitch = pitches[index, t]
-            if pitch > 0:
-                pitch_values.append(pitch)
-        
-        if len(pitch_values) > 1:
-            pitch_values = np.array(pitch_values)
-            jitter = np.mean(np.abs(np.diff(pitch_values)) / (pitch_values[:-1] + 1e-10))
-        else:
-            jitter = 0.0
+        jitter = rel_diff_mean(pitch_values)
         
         # Shimmer approximation
         rms = librosa.feature.rms(y=audio)[0]
-        if len(rms) > 1:
-            shimmer = np.mean(np.abs(np.diff(rms)) / (rms[:-1] + 1e-10))
-        else:
-            shimmer = 0.0
+        shimmer = rel_diff_mean(rms)
         
-        # Harmonic-to-Noise Ratio
-        harmonic, percussive = librosa.effects.hpss(audio)
-        hnr = 10 * np.log10(
-            (np.sum(harmonic**2) + 1e-10) / (np.sum(percussive**2) + 1e-10)
-        )
+        # Harmonic-to-Noise Ratio from the autocorrelation peak in the
+        # 50-500 Hz pitch lag range (periodic energy vs. the remainder)
+        acf = librosa.autocorrelate(audio, max_size=sr // 50)
+        peak = max(acf[sr // 500:].max(), 0.0)
+        hnr = 10 * np.log10((peak + 1e-10) / (acf[0] - peak + 1e-10))
         
-        return [jitter, shimmer, hnr]
+        return np.array([jitter, shimmer, hnr], dtype=np.float32)
     
-    def _extract_temporal_features(self, audio: np.ndarray, sr: int) -> list:
+    def _extract_temporal_features(
+        self, audio: np.ndarray, sr: int, mel_db: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
         Extract temporal features (4 features)
         - Silence ratio
         - Average pause duration
         - Onset strength (mean, std)
         """
-        # Speech/silence intervals
+        # Speech/silence intervals, shape (n_intervals, 2)
         intervals = librosa.effects.split(audio, top_db=30)
         
-        if len(intervals) > 0:
-            speech_duration = sum([end - start for start, end in intervals])
+        if intervals.size:
+            speech_duration = int((intervals[:, 1] - intervals[:, 0]).sum())
             silence_ratio = 1 - (speech_duration / len(audio))
             
-            # Average pause duration
-            if len(intervals) > 1:
-                pauses = [intervals[i+1][0] - intervals[i][1] 
-                         for i in range(len(intervals)-1)]
-                avg_pause = np.mean(pauses) / sr if pauses else 0.0
-            else:
-                avg_pause = 0.0
+            # Average pause duration (gaps between consecutive intervals)
+            pauses = intervals[1:, 0] - intervals[:-1, 1]
+            avg_pause = pauses.mean() / sr if pauses.size else 0.0
         else:
             silence_ratio = 1.0
             avg_pause = 0.0
         
         # Onset strength (rhythm)
-        onset_env = librosa.onset.onset_strength(y=audio, sr=sr)
-        onset_mean = np.mean(onset_env)
-        onset_std = np.std(onset_env)
+        if mel_db is None:
+            mel_db = self._mel_db(self._magnitude_spectrogram(audio) ** 2, sr)
+        onset_env = librosa.onset.onset_strength(S=mel_db, sr=sr)
+        onset_mean, onset_std = _mean_std(onset_env)
         
-        return [silence_ratio, avg_pause, onset_mean, onset_std]
+        return np.array([silence_ratio, avg_pause, onset_mean, onset_std], dtype=np.float32)
     
-    def _extract_chroma_features(self, audio: np.ndarray, sr: int) -> list:
+    def _extract_chroma_features(
+        self, audio: np.ndarray, sr: int, S_power: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
         Extract chroma features (24 features)
         - 12 chroma bins (mean)
         - 12 chroma bins (std)
         """
-        chroma = librosa.feature.chroma_stft(y=audio, sr=sr)
+        if S_power is None:
+            S_power = self._magnitude_spectrogram(audio) ** 2
+        
+        # Same steps as librosa.feature.chroma_stft, with the filterbank cached
+        tuning = librosa.estimate_tuning(S=S_power, sr=sr, bins_per_octave=12)
+        chroma = librosa.util.normalize(
+            _chroma_filters(sr, self.n_fft, float(tuning)) @ S_power,
+            norm=np.inf,
+            axis=-2
+        )
         
-        chroma_mean = np.mean(chroma, axis=1)
-        chroma_std = np.std(chroma, axis=1)
+        chroma_mean, chroma_std = _mean_std(chroma)
         
-        return list(np.concatenate([chroma_mean, chroma_std]))
+        return np.concatenate([chroma_mean, chroma_std])
+
+
+class TorchAudioProcessor(AudioProcessor):
+    """
+    AudioProcessor with the STFT / mel front end on torchaudio
+    
+    The FFT and mel projection run as torch kernels (on GPU when
+    available), batched over every signal in extract_features_batch.
+    The spectrograms then come back to NumPy for the librosa-only
+    extractors (piptrack, contrast, chroma, ...), so the feature layout
+    stays defined in one place.
+    """
+    
+    def __init__(self, target_sr: int = 22050, device: Optional[str] = None):
+        super().__init__(target_sr)
+        
+        # Optional dependency - imported here so the base processor never needs it
+        import torch
+        import torchaudio
+        
+        self._torch = torch
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        
+        # Built once and kept on the device; parameters mirror librosa's defaults
+        self._torch_window = torch.hann_window(self.n_fft, device=self.device)
+        self._mel_scale = torchaudio.transforms.MelScale(
+            n_mels=128,
+            sample_rate=target_sr,
+            n_stft=self.n_fft // 2 + 1,
+            norm="slaney",
+            mel_scale="slaney"
+        ).to(self.device)
+        
+        logger.info(f"torchaudio front end enabled on {self.device}")
+    
+    def _spectral_front_end_batch(
+        self, batch: np.ndarray, sr: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Same outputs as the base implementation, computed with torch kernels"""
+        if sr != self.target_sr:
+            # Mel filterbank is built for target_sr only
+            return super()._spectral_front_end_batch(batch, sr)
+        
+        torch = self._torch
+        with torch.inference_mode():
+            y = torch.from_numpy(batch).to(self.device)
+            D = torch.stft(
+                y,
+                n_fft=self.n_fft,
+                hop_length=self.hop_length,
+                window=self._torch_window,
+                center=True,
+                pad_mode="constant",
+                return_complex=True
+            )
+            S = D.abs()
+            S_power = S.square()
+            mel = self._mel_scale(S_power)
+        
+        return S.cpu().numpy(), S_power.cpu().numpy(), mel.cpu().numpy()
+
+
+def get_audio_processor(target_sr: int = 22050, use_torchaudio: bool = False) -> AudioProcessor:
+    """
+    Factory function to get the configured audio processor
+    Falls back to the librosa processor if torchaudio is unavailable
+    """
+    if use_torchaudio:
+        try:
+            return TorchAudioProcessor(target_sr=target_sr)
+        except ImportError as e:
+            logger.warning(f"torchaudio requested but not available: {e}")
+    
+    return AudioProcessor(target_sr=target_sr)
 
 
 # Singleton instance
@@ -6,8 +6,8 @@ API Key authentication with rate limiting support
 from fastapi import HTTPException, Security, Request
 from fastapi.security import APIKeyHeader
 from typing import Optional
+import hmac
 import time
-from collections import defaultdict
 import logging
 
 from .config import settings
@@ -17,74 +17,199 @@ logger = logging.getLogger(__name__)
 # API Key header configuration
 API_KEY_HEADER = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+# Valid keys, encoded once for constant-time comparison
+VALID_API_KEYS = frozenset(key.encode() for key in settings.api_keys)
+
+
+def is_valid_api_key(api_key: str) -> bool:
+    """
+    Compare against every configured key with hmac.compare_digest
+    Checks all keys (no early exit) so timing does not reveal which
+    key, or how much of one, matched
+    """
+    candidate = api_key.encode()
+    valid = False
+    for key in VALID_API_KEYS:
+        valid |= hmac.compare_digest(candidate, key)
+    return valid
+
 
 class RateLimiter:
     """
-    In-memory rate limiter
+    In-memory token-bucket rate limiter
     In production, use Redis for distributed rate limiting
+    
+    Each key holds one bucket per window. Buckets refill continuously at
+    limit/window tokens per second, so every check is O(1) and
+    allocation-free regardless of the configured limits. The methods are
+    coroutines (without awaiting anything) so this limiter and
+    RedisRateLimiter share one interface.
     """
     
     def __init__(self):
-        self.requests: dict = defaultdict(list)
         self.limits = {
             'per_minute': settings.rate_limit_per_minute,
             'per_hour': settings.rate_limit_per_hour
         }
+        self.windows = {
+            'per_minute': 60,
+            'per_hour': 3600
+        }
+        # api_key -> {window_name: [tokens, last_refill]}
+        self.buckets: dict = {}
     
-    def _cleanup_old_requests(self, api_key: str, window_seconds: int) -> list:
-        """Remove requests older than the window"""
-        current_time = time.time()
-        cutoff = current_time - window_seconds
+    def _refill(self, api_key: str) -> dict:
+        """Top up the key's buckets for the time elapsed since the last call"""
+        now = time.monotonic()
+        
+        buckets = self.buckets.get(api_key)
+        if buckets is None:
+            buckets = {name: [float(limit), now] for name, limit in self.limits.items()}
+            self.buckets[api_key] = buckets
+            return buckets
         
-        self.requests[api_key] = [
-            ts for ts in self.requests[api_key] 
-            if ts > cutoff
-        ]
+        for name, bucket in buckets.items():
+            limit = self.limits[name]
+            elapsed = now - bucket[1]
+            bucket[0] = min(limit, bucket[0] + elapsed * limit / self.windows[name])
+            bucket[1] = now
         
-        return self.requests[api_key]
+        return buckets
     
-    def check_rate_limit(self, api_key: str) -> tuple[bool, Optional[str]]:
+    async def check_rate_limit(self, api_key: str) -> tuple[bool, Optional[str]]:
         """
         Check if request is within rate limits
         
         Returns:
             (is_allowed, error_message)
         """
-        current_time = time.time()
+        buckets = self._refill(api_key)
         
         # Check per-minute limit
-        minute_requests = self._cleanup_old_requests(api_key, 60)
-        if len(minute_requests) >= self.limits['per_minute']:
+        if buckets['per_minute'][0] < 1:
             return False, f"Rate limit exceeded: {self.limits['per_minute']} requests per minute"
         
         # Check per-hour limit
-        hour_requests = self._cleanup_old_requests(api_key, 3600)
-        if len(hour_requests) >= self.limits['per_hour']:
+        if buckets['per_hour'][0] < 1:
             return False, f"Rate limit exceeded: {self.limits['per_hour']} requests per hour"
         
         # Record this request
-        self.requests[api_key].append(current_time)
+        for bucket in buckets.values():
+            bucket[0] -= 1
         
         return True, None
     
-    def get_remaining(self, api_key: str) -> dict:
+    async def get_remaining(self, api_key: str) -> dict:
         """Get remaining rate limits for an API key"""
-        self._cleanup_old_requests(api_key, 3600)
+        buckets = self._refill(api_key)
+        
+        return {
+            'remaining_per_minute': max(0, int(buckets['per_minute'][0])),
+            'remaining_per_hour': max(0, int(buckets['per_hour'][0]))
+        }
+
+
+class RedisRateLimiter:
+    """
+    Fixed-window rate limiter shared by all workers through Redis
+    
+    The in-memory limiter is per process, so with N uvicorn workers each
+    key effectively gets N times its limit. Here the counters live in
+    Redis and one Lua script call per request checks and increments both
+    windows atomically. Uses the asyncio client, so checks never block
+    the event loop.
+    """
+    
+    # KEYS: minute counter, hour counter
+    # ARGV: minute limit, hour limit, minute window (s), hour window (s)
+    # Returns {status, minute_count, hour_count}; status 0/1 = minute/hour
+    # limit exceeded, 2 = allowed (counters incremented)
+    CHECK_SCRIPT = """
+    local minute = tonumber(redis.call('GET', KEYS[1]) or '0')
+    local hour = tonumber(redis.call('GET', KEYS[2]) or '0')
+    if minute >= tonumber(ARGV[1]) then return {0, minute, hour} end
+    if hour >= tonumber(ARGV[2]) then return {1, minute, hour} end
+    if redis.call('INCR', KEYS[1]) == 1 then redis.call('EXPIRE', KEYS[1], ARGV[3]) end
+    if redis.call('INCR', KEYS[2]) == 1 then redis.call('EXPIRE', KEYS[2], ARGV[4]) end
+    return {2, minute + 1, hour + 1}
+    """
+    
+    def __init__(self, redis_url: str, prefix: str = "ratelimit:"):
+        # Optional dependency - only needed when REDIS_URL is configured
+        import redis.asyncio as redis
+        
+        self.limits = {
+            'per_minute': settings.rate_limit_per_minute,
+            'per_hour': settings.rate_limit_per_hour
+        }
+        self.windows = {
+            'per_minute': 60,
+            'per_hour': 3600
+        }
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+        self._check = self._redis.register_script(self.CHECK_SCRIPT)
+    
+    def _keys(self, api_key: str) -> list:
+        return [f"{self.prefix}{api_key}:minute", f"{self.prefix}{api_key}:hour"]
+    
+    async def check_rate_limit(self, api_key: str) -> tuple[bool, Optional[str]]:
+        """
+        Check if request is within rate limits
+        
+        Returns:
+            (is_allowed, error_message)
+        """
+        try:
+            status, _, _ = await self._check(
+                keys=self._keys(api_key),
+                args=[
+                    self.limits['per_minute'], self.limits['per_hour'],
+                    self.windows['per_minute'], self.windows['per_hour']
+                ]
+            )
+        except Exception as e:
+            # Fail open: an unreachable Redis should not take the API down
+            logger.error(f"Redis rate limit check failed: {e}")
+            return True, None
         
-        minute_requests = len([
-            ts for ts in self.requests[api_key]
-            if ts > time.time() - 60
-        ])
-        hour_requests = len(self.requests[api_key])
+        if status == 0:
+            return False, f"Rate limit exceeded: {self.limits['per_minute']} requests per minute"
+        if status == 1:
+            return False, f"Rate limit exceeded: {self.limits['per_hour']} requests per hour"
+        
+        return True, None
+    
+    async def get_remaining(self, api_key: str) -> dict:
+        """Get remaining rate limits for an API key"""
+        try:
+            minute, hour = await self._redis.mget(self._keys(api_key))
+        except Exception as e:
+            logger.error(f"Redis rate limit lookup failed: {e}")
+            minute = hour = None
         
         return {
-            'remaining_per_minute': max(0, self.limits['per_minute'] - minute_requests),
-            'remaining_per_hour': max(0, self.limits['per_hour'] - hour_requests)
+            'remaining_per_minute': max(0, self.limits['per_minute'] - int(minute or 0)),
+            'remaining_per_hour': max(0, self.limits['per_hour'] - int(hour or 0))
         }
 
 
+def get_rate_limiter() -> RateLimiter | RedisRateLimiter:
+    """
+    Factory function to get the configured rate limiter
+    Uses Redis when REDIS_URL is set, otherwise the in-memory limiter
+    """
+    if settings.redis_url:
+        try:
+            return RedisRateLimiter(settings.redis_url)
+        except ImportError as e:
+            logger.warning(f"REDIS_URL set but redis is not installed: {e}")
+    
+    return RateLimiter()
+
+
 # Global rate limiter instance
-rate_limiter = RateLimiter()
+rate_limiter = get_rate_limiter()
 
 
 async def verify_api_key(
@@ -99,7 +224,8 @@ async def verify_api_key(
     """
     # Check if API key is provided
     if not api_key:
-        logger.warning(f"Missing API key from {request.client.host}")
+        client_host = request.client.host if request.client else "unknown"
+        logger.warning(f"Missing API key from {client_host}")
         raise HTTPException(
             status_code=401,
             detail="API key required. Include X-API-Key header.",
@@ -107,7 +233,7 @@ async def verify_api_key(
         )
     
     # Validate API key
-    if api_key not in settings.api_keys:
+    if not is_valid_api_key(api_key):
         logger.warning(f"Invalid API key attempt: {api_key[:8]}...")
         raise HTTPException(
             status_code=403,
@@ -115,11 +241,11 @@ async def verify_api_key(
         )
     
     # Check rate limiting
-    is_allowed, error_message = rate_limiter.check_rate_limit(api_key)
+    is_allowed, error_message = await rate_limiter.check_rate_limit(api_key)
     if not is_allowed:
         logger.warning(f"Rate limit exceeded for key: {api_key[:8]}...")
         
-        remaining = rate_limiter.get_remaining(api_key)
+        remaining = await rate_limiter.get_remaining(api_key)
         raise HTTPException(
             status_code=429,
             detail=error_message,
@@ -134,9 +260,9 @@ async def verify_api_key(
     return api_key
 
 
-def get_rate_limit_headers(api_key: str) -> dict:
+async def get_rate_limit_headers(api_key: str) -> dict:
     """Get rate limit headers for response"""
-    remaining = rate_limiter.get_remaining(api_key)
+    remaining = await rate_limiter.get_remaining(api_key)
     return {
         "X-RateLimit-Limit-Minute": str(settings.rate_limit_per_minute),
         "X-RateLimit-Limit-Hour": str(settings.rate_limit_per_hour),
@@ -0,0 +1,109 @@
+"""
+Prediction Micro-Batching
+Groups classifier calls from concurrent /detect requests into one
+predict_batch call
+"""
+
+import asyncio
+from typing import Callable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PredictBatchFn = Callable[[np.ndarray, List[str]], List[Tuple[str, float]]]
+
+
+class PredictionBatcher:
+    """
+    Collects (features, language) pairs for up to max_wait seconds (or
+    max_batch_size items) and classifies them with a single predict_batch
+    call. Model ensembles cost nearly the same for 1 row as for 32, so
+    concurrent requests share that cost instead of paying it each.
+
+    A prediction that finds nothing else queued is dispatched at once, so
+    the window only applies under concurrency. predict_batch runs in the
+    default thread pool, off the event loop; requests arriving meanwhile
+    queue up for the next batch.
+    """
+
+    def __init__(
+        self,
+        predict_batch: PredictBatchFn,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005
+    ):
+        self._predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the dispatch task on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def predict(self, features: np.ndarray, language: str) -> Tuple[str, float]:
+        """Classify one feature vector as part of the next batch"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, language, future))
+        return await future
+
+    async def _next_batch(self) -> list:
+        """Wait for one item, then gather more until the window or batch size runs out"""
+        batch = [await self._queue.get()]
+
+        # Take whatever is already queued; a lone request does not wait
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if len(batch) == 1:
+            return batch
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            futures = [future for _, _, future in batch]
+
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    None,
+                    self._predict_batch,
+                    np.stack([features for features, _, _ in batch]),
+                    [language for _, language, _ in batch]
+                )
+            except Exception as e:
+                logger.error(f"Batched prediction failed ({len(batch)} items): {e}")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                # Skip requests that were cancelled (client disconnect) while queued
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,130 @@
+"""
+Feature and Result Caches
+Content-addressed caches of extracted feature vectors and detection results
+In-process LRU with an optional shared Redis tier for features
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(audio_bytes: bytes) -> str:
+    """Hex digest identifying an upload by its content"""
+    return hashlib.blake2b(audio_bytes, digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Bounded in-process LRU with a per-entry TTL (max_entries <= 0 disables)"""
+
+    def __init__(self, max_entries: int = 1024, ttl: int = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, value), least recently used first
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FeatureCache:
+    """
+    Maps an audio content key to (features, duration)
+
+    Repeat uploads (client retries, dashboards, test clients) skip decoding
+    and feature extraction entirely. Entries live in a bounded in-process
+    LRU; if a Redis URL is given they are also shared across workers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: int = 3600,
+        redis_url: Optional[str] = None,
+        prefix: str = "features:"
+    ):
+        self.ttl = ttl
+        self.prefix = prefix
+        self._local = LRUCache(max_entries=max_entries, ttl=ttl)
+        self._redis = None
+
+        if redis_url:
+            try:
+                import redis.asyncio as redis
+                self._redis = redis.Redis.from_url(redis_url)
+                logger.info("Feature cache backed by Redis")
+            except ImportError:
+                logger.warning("redis package not installed - using in-process feature cache only")
+
+    async def get(self, key: str) -> Optional[Tuple[np.ndarray, float]]:
+        """Return cached (features, duration) or None on a miss"""
+        cached = self._local.get(key)
+        if cached is not None:
+            return cached
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(self.prefix + key)
+            except Exception as e:
+                logger.warning(f"Redis feature cache read failed: {e}")
+                return None
+            if raw is not None:
+                cached = self._decode(raw)
+                self._local.set(key, cached)
+                return cached
+
+        return None
+
+    async def set(self, key: str, features: np.ndarray, duration: float) -> None:
+        """Store features and duration for a content key"""
+        features = np.asarray(features, dtype=np.float32)
+        self._local.set(key, (features, duration))
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(self.prefix + key, self._encode(features, duration), ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"Redis feature cache write failed: {e}")
+
+    def clear(self) -> None:
+        """Drop the in-process entries (Redis entries expire on their own)"""
+        self._local.clear()
+
+    @staticmethod
+    def _encode(features: np.ndarray, duration: float) -> bytes:
+        """Pack as float32: [duration, *features]"""
+        return np.concatenate(([duration], features)).astype(np.float32).tobytes()
+
+    @staticmethod
+    def _decode(raw: bytes) -> Tuple[np.ndarray, float]:
+        values = np.frombuffer(raw, dtype=np.float32)
+        return values[1:], float(values[0])
@@ -4,24 +4,83 @@ Supports both mock classifier (MVP) and trained ensemble models
 """
 
 import numpy as np
+from numba import njit
 import joblib
 import json
 from pathlib import Path
-from typing import Tuple, Optional, Dict
+from typing import Tuple, Optional, Dict, List
 import logging
 
+from .config import settings
+
 logger = logging.getLogger(__name__)
 
 
+# Feature indices (based on audio_processor.py extraction order):
+# 0-79: MFCC (40 mean + 40 std)
+# 80-89: Spectral (10 features)
+# 90-95: Prosodic (pitch_mean, pitch_std, pitch_range, energy_mean, energy_std, zcr)
+# 96-98: Voice quality (jitter, shimmer, hnr)
+# 99-102: Temporal (silence_ratio, avg_pause, onset_mean, onset_std)
+# 103-126: Chroma (24 features)
+MOCK_MIN_FEATURES = 102  # highest index read by the heuristic is 101
+
+
+@njit(cache=True)
+def _mock_score(features: np.ndarray) -> float:
+    """Raw heuristic AI score (unclamped) for MockVoiceClassifier"""
+    ai_score = 0.0
+    
+    # 1. Check pitch variance (index 91 = pitch_std)
+    pitch_std = features[91]
+    if pitch_std < 30:  # Low pitch variation suggests AI
+        ai_score += 0.25
+    elif pitch_std > 100:  # High variation suggests human
+        ai_score -= 0.1
+    
+    # 2. Check MFCC consistency (std of MFCC std values)
+    mfcc_consistency = np.std(features[40:80])
+    if mfcc_consistency < 2:  # Very consistent MFCCs suggest AI
+        ai_score += 0.2
+    
+    # 3. Check jitter (index 96)
+    jitter = features[96]
+    if jitter < 0.02:  # Very low jitter suggests AI
+        ai_score += 0.15
+    elif jitter > 0.05:  # High jitter suggests human
+        ai_score -= 0.1
+    
+    # 4. Check shimmer (index 97)
+    if features[97] < 0.03:  # Very low shimmer suggests AI
+        ai_score += 0.15
+    
+    # 5. Check HNR (index 98) - Harmonic to Noise Ratio
+    if features[98] > 15:  # Very clean audio suggests AI
+        ai_score += 0.15
+    
+    # 6. Check onset patterns (speech rhythm, index 101 = onset_std)
+    if features[101] < 0.5:  # Very consistent rhythm suggests AI
+        ai_score += 0.1
+    
+    return ai_score
+
+
 class MockVoiceClassifier:
     """
     Mock classifier for MVP testing
     Uses heuristic-based classification before trained models are available
     """
     
-    def __init__(self):
+    def __init__(self, add_jitter: Optional[bool] = None):
         self.model_version = "1.0.0-mock"
         self.is_mock = True
+        
+        # Random score jitter for demo variety - debug builds only
+        self._add_jitter = settings.debug if add_jitter is None else add_jitter
+        self._rng = np.random.default_rng()
+        
+        # Compile (or load from the numba cache) before the first request
+        _mock_score(np.zeros(MOCK_MIN_FEATURES, dtype=np.float32))
         logger.info("Initialized mock classifier")
     
     def predict(self, features: np.ndarray, language: str) -> Tuple[str, float]:
@@ -29,63 +88,25 @@ class MockVoiceClassifier:
         Predict if voice is AI-generated or human using heuristics
         
         AI-generated voices typically have:
-        - Lower pitch variance (features[81] - pitch_std)
+        - Lower pitch variance (features[91] - pitch_std)
         - More consistent MFCC patterns
         - Higher spectral flatness
         - Lower jitter and shimmer
         """
-        # Feature indices (based on audio_processor.py extraction order):
-        # 0-79: MFCC (40 mean + 40 std)
-        # 80-89: Spectral (10 features)
-        # 90-95: Prosodic (pitch_mean, pitch_std, pitch_range, energy_mean, energy_std, zcr)
-        # 96-98: Voice quality (jitter, shimmer, hnr)
-        # 99-102: Temporal (silence_ratio, avg_pause, onset_mean, onset_std)
-        # 103-126: Chroma (24 features)
-        
-        ai_score = 0.0
-        
-        # 1. Check pitch variance (index 91 = pitch_std)
-        pitch_std = features[91] if len(features) > 91 else 0
-        if pitch_std < 30:  # Low pitch variation suggests AI
-            ai_score += 0.25
-        elif pitch_std > 100:  # High variation suggests human
-            ai_score -= 0.1
-        
-        # 2. Check MFCC consistency (std of MFCC std values)
-        if len(features) >= 80:
-            mfcc_std_values = features[40:80]  # MFCC std values
-            mfcc_consistency = np.std(mfcc_std_values)
-            if mfcc_consistency < 2:  # Very consistent MFCCs suggest AI
-                ai_score += 0.2
-        
-        # 3. Check jitter (index 96)
-        jitter = features[96] if len(features) > 96 else 0
-        if jitter < 0.02:  # Very low jitter suggests AI
-            ai_score += 0.15
-        elif jitter > 0.05:  # High jitter suggests human
-            ai_score -= 0.1
-        
-        # 4. Check shimmer (index 97)
-        shimmer = features[97] if len(features) > 97 else 0
-        if shimmer < 0.03:  # Very low shimmer suggests AI
-            ai_score += 0.15
-        
-        # 5. Check HNR (index 98) - Harmonic to Noise Ratio
-        hnr = features[98] if len(features) > 98 else 0
-        if hnr > 15:  # Very clean audio suggests AI
-            ai_score += 0.15
-        
-        # 6. Check onset patterns (speech rhythm)
-        onset_std = features[101] if len(features) > 101 else 0
-        if onset_std < 0.5:  # Very consistent rhythm suggests AI
-            ai_score += 0.1
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if features.shape[0] < MOCK_MIN_FEATURES:
+            raise ValueError(
+                f"Expected at least {MOCK_MIN_FEATURES} features, got {features.shape[0]}"
+            )
+        
+        ai_score = float(_mock_score(features))
         
         # Normalize score to 0-1 range
         ai_score = max(0, min(1, 0.5 + ai_score))
         
-        # Add slight randomness for demo variety (remove in production)
-        import random
-        ai_score += random.uniform(-0.1, 0.1)
+        # Add slight randomness for demo variety (debug only)
+        if self._add_jitter:
+            ai_score += self._rng.uniform(-0.1, 0.1)
         ai_score = max(0.05, min(0.95, ai_score))
         
         # Determine prediction
@@ -94,6 +115,10 @@ class MockVoiceClassifier:
         confidence = ai_score if is_ai else (1 - ai_score)
         
         return prediction, round(confidence, 3)
+    
+    def predict_batch(self, features: np.ndarray, languages: List[str]) -> List[Tuple[str, float]]:
+        """Predict for a (n_samples, n_features) matrix, one language per row"""
+        return [self.predict(row, language) for row, language in zip(features, languages)]
 
 
 class EnsembleVoiceClassifier:
@@ -107,6 +132,8 @@ class EnsembleVoiceClassifier:
         self.models: Dict = {}
         self.scaler = None
         self.weights: Dict = {}
+        self._model_list: List[Tuple[str, object]] = []
+        self._weights_vec: np.ndarray = np.zeros(0)
         self.model_version = "1.0.0"
         self.is_mock = False
         
@@ -142,6 +169,13 @@ class EnsembleVoiceClassifier:
             
             if not self.models:
                 raise FileNotFoundError("No models found")
+            
+            # Fixed model order + weight vector so scoring is one matmul
+            self._model_list = list(self.models.items())
+            self._weights_vec = np.array(
+                [self.weights.get(name, 0) for name, _ in self._model_list],
+                dtype=np.float64
+            )
                 
         except Exception as e:
             logger.error(f"Error loading models: {e}")
@@ -155,36 +189,47 @@ class EnsembleVoiceClassifier:
         if features.ndim == 1:
             features = features.reshape(1, -1)
         
+        return self.predict_batch(features, [language])[0]
+    
+    def predict_batch(self, features: np.ndarray, languages: List[str]) -> List[Tuple[str, float]]:
+        """
+        Weighted ensemble voting for a (n_samples, n_features) matrix
+        Each model scores the whole batch in one predict_proba call
+        """
         # Scale features
         if self.scaler:
             features_scaled = self.scaler.transform(features)
         else:
             features_scaled = features
         
-        # Get predictions from all models
-        predictions = {}
-        for name, model in self.models.items():
+        # Get predictions from all models, shape (n_models, n_samples)
+        probs = np.zeros((len(self._model_list), features_scaled.shape[0]))
+        succeeded = np.ones(len(self._model_list), dtype=bool)
+        for i, (name, model) in enumerate(self._model_list):
             try:
-                proba = model.predict_proba(features_scaled)[0, 1]
-                predictions[name] = proba
+                probs[i] = model.predict_proba(features_scaled)[:, 1]
             except Exception as e:
+                succeeded[i] = False
                 logger.warning(f"Model {name} prediction failed: {e}")
         
-        if not predictions:
+        if not succeeded.any():
             raise RuntimeError("All models failed to predict")
         
         # Weighted ensemble
-        ensemble_score = sum(
-            self.weights.get(name, 0) * score 
-            for name, score in predictions.items()
-        )
+        if succeeded.all():
+            ensemble_scores = self._weights_vec @ probs
+        else:
+            ensemble_scores = self._weights_vec[succeeded] @ probs[succeeded]
         
-        # Determine prediction
-        is_ai = ensemble_score > 0.5
-        prediction = "AI_GENERATED" if is_ai else "HUMAN"
-        confidence = ensemble_score if is_ai else (1 - ensemble_score)
+        results = []
+        for ensemble_score in ensemble_scores:
+            # Determine prediction
+            is_ai = ensemble_score > 0.5
+            prediction = "AI_GENERATED" if is_ai else "HUMAN"
+            confidence = ensemble_score if is_ai else (1 - ensemble_score)
+            results.append((prediction, round(float(confidence), 3)))
         
-        return prediction, round(confidence, 3)
+        return results
 
 
 def get_classifier(model_dir: Optional[str] = None) -> MockVoiceClassifier | EnsembleVoiceClassifier:
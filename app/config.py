@@ -20,7 +20,7 @@ class Settings(BaseSettings):
     # Server Settings
     host: str = "0.0.0.0"
     port: int = 8000
-    workers: int = 4
+    workers: Optional[int] = None  # uvicorn worker processes (None = CPU count)
     
     # Authentication
     api_keys: Set[str] = {"demo_key_12345"}
@@ -30,14 +30,21 @@ class Settings(BaseSettings):
     min_audio_duration: float = 1.0
     max_audio_duration: float = 60.0
     max_file_size_mb: int = 10
+    use_torchaudio: bool = False  # STFT/mel on torchaudio (GPU if available)
+    max_batch_size: int = 16  # max items per /detect/batch request
+    pipeline_workers: Optional[int] = None  # extraction processes per uvicorn worker (None = CPUs / WORKERS, 0 = in-process)
     
     # Model Settings
     model_path: str = "models"
     model_version: str = "1.0.0"
+    predict_batch_size: int = 32  # concurrent /detect predictions per classifier call (0 disables batching)
+    predict_batch_wait_ms: float = 5.0  # how long a batch already holding 2+ predictions waits for more
     
     # Redis Settings (for caching)
     redis_url: Optional[str] = None
     cache_ttl: int = 3600  # 1 hour
+    feature_cache_size: int = 1024  # in-process entries, 0 disables
+    result_cache_size: int = 1024  # in-process (audio, language) results, 0 disables
     
     # Database Settings
     database_url: Optional[str] = None
@@ -53,6 +60,20 @@ class Settings(BaseSettings):
     enable_metrics: bool = True
     sentry_dsn: Optional[str] = None
     
+    def server_workers(self) -> int:
+        """uvicorn worker processes"""
+        return self.workers or os.cpu_count() or 1
+    
+    def pipeline_workers_per_server(self) -> int:
+        """
+        Feature extraction processes for each uvicorn worker
+        By default the CPUs are split across the uvicorn workers, so the
+        total process count stays near the core count
+        """
+        if self.pipeline_workers is not None:
+            return self.pipeline_workers
+        return max(1, (os.cpu_count() or 1) // self.server_workers())
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
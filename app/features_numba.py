@@ -0,0 +1,97 @@
+"""
+Numba Feature Kernels
+Per-frame aggregations used by the audio processor, compiled with numba
+(cached on disk, so only the first process start pays the compile)
+"""
+
+from typing import Tuple
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def rel_diff_mean(x: np.ndarray) -> float:
+    """mean(|x[i+1] - x[i]| / x[i]) in one pass (jitter / shimmer)"""
+    n = x.shape[0] - 1
+    if n <= 0:
+        return 0.0
+    total = 0.0
+    for i in range(n):
+        total += abs(x[i + 1] - x[i]) / (x[i] + 1e-10)
+    return total / n
+
+
+@njit(cache=True, fastmath=True)
+def row_mean_std(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and (population) std of each row of a 2-D array
+    One read per element, float64 accumulators
+    """
+    n_rows, n = x.shape
+    mean = np.zeros(n_rows)
+    std = np.zeros(n_rows)
+    if n == 0:
+        return mean, std
+    for r in range(n_rows):
+        s1 = 0.0
+        s2 = 0.0
+        for i in range(n):
+            v = np.float64(x[r, i])
+            s1 += v
+            s2 += v * v
+        m = s1 / n
+        mean[r] = m
+        std[r] = np.sqrt(max(s2 / n - m * m, 0.0))
+    return mean, std
+
+
+@njit(cache=True, fastmath=True)
+def voiced_pitch(pitches: np.ndarray, magnitudes: np.ndarray) -> np.ndarray:
+    """
+    Pitch of the strongest piptrack bin per frame, voiced frames only
+    Replaces argmax + fancy index + boolean mask with a single pass
+    """
+    n_bins, n_frames = magnitudes.shape
+    out = np.empty(n_frames, dtype=pitches.dtype)
+    count = 0
+    for t in range(n_frames):
+        best = 0
+        for b in range(1, n_bins):
+            if magnitudes[b, t] > magnitudes[best, t]:
+                best = b
+        pitch = pitches[best, t]
+        if pitch > 0:
+            out[count] = pitch
+            count += 1
+    return out[:count]
+
+
+@njit(cache=True, fastmath=True)
+def pitch_stats(pitch_values: np.ndarray) -> Tuple[float, float, float]:
+    """Mean, (population) std and range of the voiced pitch values in one pass"""
+    n = pitch_values.shape[0]
+    if n == 0:
+        return 0.0, 0.0, 0.0
+    s1 = 0.0
+    s2 = 0.0
+    lo = np.float64(pitch_values[0])
+    hi = lo
+    for i in range(n):
+        v = np.float64(pitch_values[i])
+        s1 += v
+        s2 += v * v
+        lo = min(lo, v)
+        hi = max(hi, v)
+    m = s1 / n
+    return m, np.sqrt(max(s2 / n - m * m, 0.0)), hi - lo
+
+
+def warm_up() -> None:
+    """Compile (or load from the cache) every kernel for the dtypes the processor uses"""
+    for dtype in (np.float32, np.float64):
+        x = np.ones((2, 4), dtype=dtype)
+        rel_diff_mean(x[0])
+        row_mean_std(x)
+        voiced_pitch(x, x)
+        pitch_stats(x[0])
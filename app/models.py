@@ -2,13 +2,54 @@
 Pydantic Models for Request/Response Validation
 """
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
 from typing import Literal, Optional, List
-import base64
+import binascii
+import pybase64
+
+from .config import settings
 
 
 # Supported languages
 SUPPORTED_LANGUAGES = ["tamil", "english", "hindi", "malayalam", "telugu"]
+Language = Literal["tamil", "english", "hindi", "malayalam", "telugu"]
+
+# Base64 characters decoded per step (multiple of 4)
+B64_CHUNK_SIZE = 64 * 1024
+
+
+def decode_b64_streaming(s: str) -> bytearray:
+    """
+    Decode base64 into one pre-sized buffer, 64 KB of text at a time
+    
+    Decoding the whole str at once first copies it to an ASCII bytes
+    object, so peak memory is ~2x the payload; chunks keep it at the
+    decoded size. Input that is not canonical base64 (line breaks,
+    stray characters, padding before the end) falls back to a lenient
+    one-shot decode.
+    """
+    if len(s) % 4 == 0:
+        out = bytearray(len(s) // 4 * 3 - s[-2:].count('='))
+        view = memoryview(out)
+        pos = 0
+        try:
+            for i in range(0, len(s), B64_CHUNK_SIZE):
+                chunk = pybase64.b64decode(s[i:i + B64_CHUNK_SIZE], validate=True)
+                view[pos:pos + len(chunk)] = chunk
+                pos += len(chunk)
+            # Padding inside the text (at a chunk boundary) passes each chunk's
+            # check but decodes to fewer bytes than sized for
+            if pos == len(out):
+                return out
+        except (binascii.Error, ValueError):
+            pass
+    
+    return bytearray(pybase64.b64decode(s))
+
+
+def max_base64_length(max_bytes: int) -> int:
+    """Longest canonical base64 text that decodes to at most max_bytes"""
+    return (max_bytes + 2) // 3 * 4
 
 
 class VoiceDetectionRequest(BaseModel):
@@ -19,22 +60,34 @@ class VoiceDetectionRequest(BaseModel):
         description="Base64-encoded audio file (MP3, WAV, or OGG)",
         min_length=100  # Minimum reasonable audio size
     )
-    language: Literal["tamil", "english", "hindi", "malayalam", "telugu"] = Field(
+    language: Language = Field(
         ...,
         description="Language of the audio sample"
     )
     
-    @field_validator('audio_base64')
-    @classmethod
-    def validate_base64(cls, v: str) -> str:
-        """Validate base64 encoding"""
+    # Decoded payload, filled in once by validation
+    _audio_bytes: bytearray = PrivateAttr(default_factory=bytearray)
+    
+    @model_validator(mode='after')
+    def validate_base64(self) -> 'VoiceDetectionRequest':
+        """Validate base64 encoding and keep the decoded bytes"""
+        # Oversized payloads are left undecoded (no allocation) and
+        # rejected by the endpoint from their length alone
+        if len(self.audio_base64) > max_base64_length(settings.max_file_size_mb * 1024 * 1024):
+            return self
         try:
-            decoded = base64.b64decode(v)
-            if len(decoded) < 100:
-                raise ValueError("Audio data too small")
-            return v
+            decoded = decode_b64_streaming(self.audio_base64)
         except Exception as e:
             raise ValueError(f"Invalid base64 encoding: {str(e)}")
+        if len(decoded) < 100:
+            raise ValueError("Invalid base64 encoding: Audio data too small")
+        self._audio_bytes = decoded
+        return self
+    
+    @property
+    def audio_bytes(self) -> bytearray:
+        """Decoded audio payload"""
+        return self._audio_bytes
     
     class Config:
         json_schema_extra = {
@@ -95,6 +148,43 @@ class VoiceDetectionResponse(BaseModel):
         }
 
 
+class BatchDetectionRequest(BaseModel):
+    """Request model for batch voice detection endpoint"""
+    
+    items: List[VoiceDetectionRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.max_batch_size,
+        description="Audio samples to analyze in one batch"
+    )
+    
+    @model_validator(mode='before')
+    @classmethod
+    def check_batch_size(cls, data):
+        """
+        Reject oversized batches before any item is validated
+        (max_length alone is checked after items, each of which decodes its payload)
+        """
+        if isinstance(data, dict) and isinstance(data.get('items'), list):
+            if len(data['items']) > settings.max_batch_size:
+                raise ValueError(f"Batch too large. Maximum items: {settings.max_batch_size}")
+        return data
+
+
+class BatchDetectionResponse(BaseModel):
+    """Response model for batch voice detection endpoint"""
+    
+    results: List[VoiceDetectionResponse] = Field(
+        ...,
+        description="One detection result per request item, in order"
+    )
+    processing_time_ms: float = Field(
+        ...,
+        ge=0,
+        description="Total processing time for the batch in milliseconds"
+    )
+
+
 class HealthResponse(BaseModel):
     """Response model for health check endpoint"""
     
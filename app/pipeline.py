@@ -0,0 +1,112 @@
+"""
+Feature Extraction Pipeline
+CPU-bound preprocess + feature extraction, run off the event loop
+(in worker processes, or inline in a thread when no pool is configured)
+"""
+
+from typing import List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from .audio_processor import AudioProcessor, get_audio_processor
+from . import features_numba
+
+logger = logging.getLogger(__name__)
+
+# Per-process processor, built once by init_worker
+_processor: Optional[AudioProcessor] = None
+
+
+class InvalidAudioError(ValueError):
+    """Audio could not be decoded or failed validation (client error)"""
+
+
+class FeatureExtractionError(RuntimeError):
+    """Feature extraction failed on valid audio (server error)"""
+
+
+def init_worker(target_sr: int = 22050, use_torchaudio: bool = False) -> None:
+    """
+    Build this process's audio processor
+    Used as the ProcessPoolExecutor initializer, so each worker pays the
+    librosa/numba setup once instead of per request
+    """
+    global _processor
+    features_numba.warm_up()
+    _processor = get_audio_processor(target_sr=target_sr, use_torchaudio=use_torchaudio)
+
+
+def get_processor() -> AudioProcessor:
+    """This process's audio processor (built on first use if needed)"""
+    if _processor is None:
+        init_worker()
+    return _processor
+
+
+def warm_up() -> None:
+    """No-op task that makes a pool worker start and build its processor"""
+    get_processor()
+
+
+def _preprocess(audio_bytes: bytes) -> Tuple[np.ndarray, int, float]:
+    try:
+        return get_processor().preprocess(audio_bytes)
+    except ValueError as e:
+        raise InvalidAudioError(str(e))
+    except Exception as e:
+        raise InvalidAudioError(f"Could not process audio: {str(e)}")
+
+
+def run_pipeline(audio_bytes: bytes) -> Tuple[np.ndarray, float]:
+    """
+    Preprocess and extract features for one upload
+
+    Returns:
+        features: float32 feature vector
+        duration: Audio duration in seconds
+
+    Raises:
+        InvalidAudioError: Undecodable or out-of-range audio
+        FeatureExtractionError: Extraction failed
+    """
+    audio, sr, duration = _preprocess(audio_bytes)
+
+    try:
+        features = get_processor().extract_all_features(audio, sr)
+    except Exception as e:
+        raise FeatureExtractionError(str(e))
+
+    return features, duration
+
+
+def run_batch_pipeline(audio_bytes_list: List[bytes]) -> Tuple[np.ndarray, List[float]]:
+    """
+    Preprocess every upload and extract features with one batched STFT
+
+    Returns:
+        features: (n_items, n_features) float32 matrix
+        durations: Audio duration per item
+
+    Raises:
+        InvalidAudioError: Message prefixed with the offending item index
+        FeatureExtractionError: Extraction failed
+    """
+    processor = get_processor()
+
+    audios = []
+    durations = []
+    for index, audio_bytes in enumerate(audio_bytes_list):
+        try:
+            audio, _, duration = _preprocess(audio_bytes)
+        except InvalidAudioError as e:
+            raise InvalidAudioError(f"Item {index}: {e}")
+        audios.append(audio)
+        durations.append(duration)
+
+    try:
+        features = processor.extract_features_batch(audios, processor.target_sr)
+    except Exception as e:
+        raise FeatureExtractionError(str(e))
+
+    return features, durations
@@ -4,29 +4,54 @@ Production-ready FastAPI application for detecting AI-generated vs Human voices
 Supports: Tamil, English, Hindi, Malayalam, Telugu
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Request
+import os
+
+# One BLAS/OpenMP/numba thread per process, set before numpy/librosa load.
+# Parallelism comes from the uvicorn and feature extraction worker
+# processes (which inherit this environment), not threads inside each one
+for _var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMBA_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+from anyio import to_thread
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
-import base64
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import multiprocessing
 import logging
 from datetime import datetime
 import time
-from typing import Optional
+from typing import List, Optional, Tuple
+import numpy as np
 
 # Import local modules
 from app.config import settings
 from app.models import (
     VoiceDetectionRequest, 
     VoiceDetectionResponse,
+    BatchDetectionRequest,
+    BatchDetectionResponse,
     HealthResponse,
     ErrorResponse,
     APIInfoResponse,
-    SUPPORTED_LANGUAGES
+    Language,
+    SUPPORTED_LANGUAGES,
+    max_base64_length
+)
+from app.pipeline import (
+    init_worker,
+    warm_up,
+    run_pipeline,
+    run_batch_pipeline,
+    InvalidAudioError,
+    FeatureExtractionError
 )
-from app.audio_processor import AudioProcessor
 from app.classifier import get_classifier, MockVoiceClassifier
 from app.auth import verify_api_key, get_rate_limit_headers
+from app.cache import FeatureCache, LRUCache, content_key
+from app.batching import PredictionBatcher
 
 # Configure logging
 logging.basicConfig(
@@ -37,21 +62,43 @@ logger = logging.getLogger(__name__)
 
 
 # Global instances
-audio_processor: Optional[AudioProcessor] = None
+pipeline_pool: Optional[ProcessPoolExecutor] = None
 classifier = None
+feature_cache: Optional[FeatureCache] = None
+result_cache: Optional[LRUCache] = None
+prediction_batcher: Optional[PredictionBatcher] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager - startup and shutdown"""
-    global audio_processor, classifier
+    global pipeline_pool, classifier, feature_cache, result_cache, prediction_batcher
     
     # Startup
     logger.info("🚀 Starting AI Voice Detection API...")
     
-    # Initialize audio processor
-    audio_processor = AudioProcessor(target_sr=settings.target_sample_rate)
-    logger.info(f"✅ Audio processor initialized (SR: {settings.target_sample_rate})")
+    # Sync dependencies/endpoints share anyio's thread pool (default 40 threads);
+    # keep it small so it does not compete with the extraction workers
+    to_thread.current_default_thread_limiter().total_tokens = max(2, (os.cpu_count() or 1) // 2)
+    
+    # Initialize feature extraction (worker processes, or inline)
+    workers = settings.pipeline_workers_per_server()
+    worker_args = (settings.target_sample_rate, settings.use_torchaudio)
+    if workers > 0:
+        # spawn: workers start clean instead of forking a threaded server
+        pipeline_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=worker_args
+        )
+        # Start the workers now (in the background) rather than on the first request
+        for _ in range(workers):
+            pipeline_pool.submit(warm_up)
+        logger.info(f"✅ Feature extraction pool started ({workers} processes, SR: {settings.target_sample_rate})")
+    else:
+        init_worker(*worker_args)
+        logger.info(f"✅ Audio processor initialized in-process (SR: {settings.target_sample_rate})")
     
     # Initialize classifier
     classifier = get_classifier(settings.model_path)
@@ -60,12 +107,38 @@ async def lifespan(app: FastAPI):
     else:
         logger.info(f"✅ Ensemble classifier loaded (version: {classifier.model_version})")
     
+    # Concurrent /detect requests share classifier calls
+    if settings.predict_batch_size > 1:
+        prediction_batcher = PredictionBatcher(
+            classifier.predict_batch,
+            max_batch_size=settings.predict_batch_size,
+            max_wait=settings.predict_batch_wait_ms / 1000
+        )
+        prediction_batcher.start()
+    
+    # Initialize feature cache
+    feature_cache = FeatureCache(
+        max_entries=settings.feature_cache_size,
+        ttl=settings.cache_ttl,
+        redis_url=settings.redis_url
+    )
+    result_cache = LRUCache(
+        max_entries=settings.result_cache_size,
+        ttl=settings.cache_ttl
+    )
+    
     logger.info(f"✅ API ready at http://{settings.host}:{settings.port}")
     
     yield
     
     # Shutdown
     logger.info("👋 Shutting down API...")
+    if prediction_batcher is not None:
+        await prediction_batcher.stop()
+        prediction_batcher = None
+    if pipeline_pool is not None:
+        pipeline_pool.shutdown(wait=True, cancel_futures=True)
+        pipeline_pool = None
 
 
 # Initialize FastAPI app
@@ -95,6 +168,7 @@ X-API-Key: your_api_key_here
     version=settings.app_version,
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -106,7 +180,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-RateLimit-Limit-Minute", "X-RateLimit-Remaining-Minute"]
+    expose_headers=["X-RateLimit-Limit-Minute", "X-RateLimit-Remaining-Minute", "X-Cache"]
 )
 
 
@@ -114,12 +188,12 @@ app.add_middleware(
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Custom HTTP exception handler with structured response"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "detail": exc.detail,
             "error_code": f"ERR_{exc.status_code}",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         },
         headers=getattr(exc, 'headers', None)
     )
@@ -129,16 +203,160 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 async def general_exception_handler(request: Request, exc: Exception):
     """Catch-all exception handler"""
     logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "detail": "Internal server error. Please try again later.",
             "error_code": "ERR_500",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         }
     )
 
 
+# ============== PIPELINE HELPERS ==============
+
+def _check_audio_size(audio_bytes: bytes) -> bytes:
+    """
+    Validate the decoded audio size
+    
+    Raises:
+        HTTPException: 400 for oversized audio
+    """
+    max_size = settings.max_file_size_mb * 1024 * 1024
+    if len(audio_bytes) > max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size: {settings.max_file_size_mb}MB"
+        )
+    
+    return audio_bytes
+
+
+def _check_base64_size(audio_base64: str) -> None:
+    """
+    Validate the upload size from the base64 length, before decoding
+    
+    Raises:
+        HTTPException: 400 for oversized audio
+    """
+    if len(audio_base64) > max_base64_length(settings.max_file_size_mb * 1024 * 1024):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size: {settings.max_file_size_mb}MB"
+        )
+
+
+async def _run_in_pipeline(func, *args):
+    """
+    Run a CPU-bound pipeline function off the event loop
+    
+    Raises:
+        HTTPException: 400 for invalid audio, 500 for extraction failures
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        # pipeline_pool None -> default thread pool, processor in this process
+        return await loop.run_in_executor(pipeline_pool, func, *args)
+    except InvalidAudioError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FeatureExtractionError as e:
+        logger.error(f"Feature extraction error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error extracting audio features"
+        )
+
+
+async def _extract_features(audio_bytes: bytes) -> Tuple[np.ndarray, float]:
+    """Preprocess + extract features for one upload -> (features, duration)"""
+    return await _run_in_pipeline(run_pipeline, audio_bytes)
+
+
+async def _extract_features_batch(audio_bytes_list: List[bytes]) -> Tuple[np.ndarray, List[float]]:
+    """Preprocess + batched feature extraction -> (features, durations)"""
+    return await _run_in_pipeline(run_batch_pipeline, audio_bytes_list)
+
+
+async def _detect(
+    audio_bytes: bytes,
+    language: str,
+    start_time: float,
+    response: Response
+) -> VoiceDetectionResponse:
+    """
+    Shared /detect and /detect/file path: size check, features, classification
+    Sets X-Cache: HIT when the whole result came from the result cache
+    """
+    try:
+        # 2. Validate size
+        audio_bytes = _check_audio_size(audio_bytes)
+        
+        # Identical audio + language -> identical result
+        cache_key = content_key(audio_bytes)
+        result_key = (cache_key, language)
+        cached_result = result_cache.get(result_key)
+        response.headers["X-Cache"] = "HIT" if cached_result is not None else "MISS"
+        
+        if cached_result is not None:
+            prediction, confidence, duration = cached_result
+        else:
+            # Repeat uploads reuse features extracted earlier
+            cached = await feature_cache.get(cache_key)
+            if cached is not None:
+                features, duration = cached
+            else:
+                # 3-4. Preprocess audio, extract features (off the event loop)
+                features, duration = await _extract_features(audio_bytes)
+                await feature_cache.set(cache_key, features, duration)
+            
+            # 5. Classify
+            try:
+                if prediction_batcher is not None:
+                    prediction, confidence = await prediction_batcher.predict(features, language)
+                else:
+                    prediction, confidence = await asyncio.get_running_loop().run_in_executor(
+                        None, classifier.predict, features, language
+                    )
+            except Exception as e:
+                logger.error(f"Classification error: {e}")
+                raise HTTPException(
+                    status_code=500,
+                    detail="Error during classification"
+                )
+            result_cache.set(result_key, (prediction, confidence, duration))
+        
+        # Calculate processing time
+        processing_time_ms = (time.perf_counter() - start_time) * 1000
+        
+        # Log detection
+        logger.info(
+            f"Detection: {prediction} | "
+            f"Confidence: {confidence:.3f} | "
+            f"Language: {language} | "
+            f"Duration: {duration:.2f}s | "
+            f"Time: {processing_time_ms:.2f}ms"
+        )
+        
+        return VoiceDetectionResponse(
+            prediction=prediction,
+            confidence=confidence,
+            language=language,
+            processing_time_ms=round(processing_time_ms, 2),
+            timestamp=datetime.utcnow().isoformat(),
+            audio_duration_seconds=round(duration, 2),
+            model_version=classifier.model_version if hasattr(classifier, 'model_version') else settings.model_version
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred"
+        )
+
+
 # ============== API ENDPOINTS ==============
 
 @app.get("/", response_model=APIInfoResponse, tags=["Info"])
@@ -152,6 +370,8 @@ async def root():
         endpoints={
             "health": "/health",
             "detect": "/detect (POST)",
+            "detect_file": "/detect/file (POST, multipart)",
+            "detect_batch": "/detect/batch (POST)",
             "docs": "/docs",
             "redoc": "/redoc"
         },
@@ -188,6 +408,7 @@ async def health_check():
 )
 async def detect_voice(
     request: VoiceDetectionRequest,
+    response: Response,
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -218,51 +439,110 @@ async def detect_voice(
     print(response.json())
     ```
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
+    
+    # 1. Base64 was decoded during request validation (unless already too large)
+    _check_base64_size(request.audio_base64)
+    return await _detect(request.audio_bytes, request.language, start_time, response)
+
+
+@app.post(
+    "/detect/file",
+    response_model=VoiceDetectionResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid input"},
+        401: {"model": ErrorResponse, "description": "Missing API key"},
+        403: {"model": ErrorResponse, "description": "Invalid API key"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        500: {"model": ErrorResponse, "description": "Server error"}
+    },
+    tags=["Detection"]
+)
+async def detect_voice_file(
+    response: Response,
+    file: UploadFile = File(..., description="Audio file (MP3, WAV, OGG)"),
+    language: Language = Form(..., description="Language of the audio sample"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    🎯 Detect AI-generated vs human speech from a raw file upload
+    
+    Same result as `/detect`, but the audio is sent as `multipart/form-data`
+    instead of base64 JSON - about 25% less data on the wire and no
+    decode step on the server.
+    
+    ### Example
+    ```bash
+    curl -X POST http://localhost:8000/detect/file \\
+      -H "X-API-Key: your_key" \\
+      -F "file=@audio.mp3" -F "language=english"
+    ```
+    """
+    start_time = time.perf_counter()
+    
+    # 1. Raw bytes, no base64 involved. Oversized uploads are rejected from
+    # their size, and at most one byte past the limit is ever read into memory
+    max_size = settings.max_file_size_mb * 1024 * 1024
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size: {settings.max_file_size_mb}MB"
+        )
+    audio_bytes = await file.read(max_size + 1)
+    
+    return await _detect(audio_bytes, language, start_time, response)
+
+
+@app.post(
+    "/detect/batch",
+    response_model=BatchDetectionResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid input"},
+        401: {"model": ErrorResponse, "description": "Missing API key"},
+        403: {"model": ErrorResponse, "description": "Invalid API key"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        500: {"model": ErrorResponse, "description": "Server error"}
+    },
+    tags=["Detection"]
+)
+async def detect_voice_batch(
+    request: BatchDetectionRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    🎯 Detect AI-generated vs human speech for several audio samples at once
+    
+    ### Request
+    - **items**: List of `{audio_base64, language}` objects (max `MAX_BATCH_SIZE`)
+    
+    ### Response
+    - **results**: One detection result per item, in request order
+    - **processing_time_ms**: Total time for the batch
+    
+    All items share one batched STFT and one classifier call, which is
+    cheaper than sending them to `/detect` one by one.
+    """
+    start_time = time.perf_counter()
     
     try:
-        # 1. Decode base64 audio
-        try:
-            audio_bytes = base64.b64decode(request.audio_base64)
-        except Exception as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid base64 encoding: {str(e)}"
-            )
+        # 1-2. Validate size (per item; the item count is checked by BatchDetectionRequest)
+        audio_bytes_list = []
+        for index, item in enumerate(request.items):
+            try:
+                _check_base64_size(item.audio_base64)
+                audio_bytes_list.append(_check_audio_size(item.audio_bytes))
+            except HTTPException as e:
+                raise HTTPException(status_code=e.status_code, detail=f"Item {index}: {e.detail}")
         
-        # 2. Validate file size
-        max_size = settings.max_file_size_mb * 1024 * 1024
-        if len(audio_bytes) > max_size:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size: {settings.max_file_size_mb}MB"
-            )
+        # 3-4. Preprocess, extract features (one batched STFT, off the event loop)
+        features, durations = await _extract_features_batch(audio_bytes_list)
         
-        # 3. Preprocess audio
+        # 5. Classify (one call for the whole batch, off the event loop)
+        languages = [item.language for item in request.items]
         try:
-            audio, sr, duration = audio_processor.preprocess(audio_bytes)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-        except Exception as e:
-            logger.error(f"Audio preprocessing error: {e}")
-            raise HTTPException(
-                status_code=400,
-                detail=f"Could not process audio: {str(e)}"
-            )
-        
-        # 4. Extract features
-        try:
-            features = audio_processor.extract_all_features(audio, sr)
-        except Exception as e:
-            logger.error(f"Feature extraction error: {e}")
-            raise HTTPException(
-                status_code=500,
-                detail="Error extracting audio features"
+            predictions = await asyncio.get_running_loop().run_in_executor(
+                None, classifier.predict_batch, features, languages
             )
-        
-        # 5. Classify
-        try:
-            prediction, confidence = classifier.predict(features, request.language)
         except Exception as e:
             logger.error(f"Classification error: {e}")
             raise HTTPException(
@@ -270,26 +550,32 @@ async def detect_voice(
                 detail="Error during classification"
             )
         
-        # Calculate processing time
-        processing_time_ms = (time.time() - start_time) * 1000
+        processing_time_ms = (time.perf_counter() - start_time) * 1000
+        timestamp = datetime.utcnow().isoformat()
+        model_version = getattr(classifier, 'model_version', settings.model_version)
         
-        # Log detection
         logger.info(
-            f"Detection: {prediction} | "
-            f"Confidence: {confidence:.3f} | "
-            f"Language: {request.language} | "
-            f"Duration: {duration:.2f}s | "
+            f"Batch detection: {len(request.items)} items | "
             f"Time: {processing_time_ms:.2f}ms"
         )
         
-        return VoiceDetectionResponse(
-            prediction=prediction,
-            confidence=confidence,
-            language=request.language,
-            processing_time_ms=round(processing_time_ms, 2),
-            timestamp=datetime.utcnow().isoformat(),
-            audio_duration_seconds=round(duration, 2),
-            model_version=classifier.model_version if hasattr(classifier, 'model_version') else settings.model_version
+        results = [
+            VoiceDetectionResponse(
+                prediction=prediction,
+                confidence=confidence,
+                language=language,
+                processing_time_ms=round(processing_time_ms, 2),
+                timestamp=timestamp,
+                audio_duration_seconds=round(duration, 2),
+                model_version=model_version
+            )
+            for (prediction, confidence), language, duration
+            in zip(predictions, languages, durations)
+        ]
+        
+        return BatchDetectionResponse(
+            results=results,
+            processing_time_ms=round(processing_time_ms, 2)
         )
         
     except HTTPException:
@@ -311,7 +597,7 @@ async def metrics():
     """
     return {
         "info": "Metrics endpoint - integrate with Prometheus for production monitoring",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow()
     }
 
 
@@ -319,10 +605,17 @@ async def metrics():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(
-        "app_main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=True,
-        workers=1  # Use 1 for development, increase for production
-    )
+    if settings.debug:
+        # Single auto-reloading worker for development
+        uvicorn.run("app_main:app", host=settings.host, port=settings.port, reload=True)
+    else:
+        # uvloop + httptools; each worker starts its own feature extraction
+        # pool, sized so all pools together share the cores (see PIPELINE_WORKERS)
+        uvicorn.run(
+            "app_main:app",
+            host=settings.host,
+            port=settings.port,
+            workers=settings.server_workers(),
+            loop="uvloop",
+            http="httptools"
+        )
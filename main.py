@@ -5,27 +5,75 @@ Supports: Tamil, English, Hindi, Malayalam, Telugu
 """
 
 from fastapi import FastAPI, HTTPException, Security, Depends
+from fastapi.responses import ORJSONResponse
 from fastapi.security import APIKeyHeader
-from pydantic import BaseModel, Field, validator
-import base64
+from pydantic import BaseModel, Field
+import asyncio
 import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 import librosa
 import numpy as np
-from typing import Literal
+import scipy.fft
+import pybase64
+import soundfile as sf
+from functools import lru_cache
+from typing import Literal, Optional
 import logging
+import time
 from datetime import datetime
 import hashlib
+import hmac
+
+# Feature extraction + inference run in this pool (see lifespan) so
+# requests use every core and never block the event loop
+process_pool: Optional[ProcessPoolExecutor] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the worker pool at startup and shut it down on exit"""
+    global process_pool
+    workers = os.cpu_count() or 1
+    # spawn: workers start clean instead of forking a threaded server
+    process_pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker
+    )
+    # Start the workers now (in the background) rather than on the first request
+    for _ in range(workers):
+        process_pool.submit(_warm_up)
+    
+    yield
+    
+    process_pool.shutdown(wait=True, cancel_futures=True)
+    process_pool = None
+
 
 # Initialize app
 app = FastAPI(
     title="AI Voice Detection API",
     description="Multilingual AI vs Human Voice Classification",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # API Key authentication
 API_KEY_HEADER = APIKeyHeader(name="X-API-Key")
-VALID_API_KEYS = {"demo_key_12345"}  # In production, use secure storage
+VALID_API_KEYS = frozenset({b"demo_key_12345"})  # In production, use secure storage
+
+# Upload size limit, checked on the base64 text so oversized payloads are
+# rejected before anything is decoded
+MAX_AUDIO_BYTES = 10 * 1024 * 1024
+MAX_AUDIO_BASE64 = (MAX_AUDIO_BYTES + 2) // 3 * 4
+
+# Shared generator for the mock classifier's random component (seeded
+# fresh in every spawned pool worker)
+_RNG = np.random.default_rng()
 
 # Logging
 logging.basicConfig(level=logging.INFO)
@@ -38,14 +86,6 @@ class VoiceDetectionRequest(BaseModel):
     language: Literal["tamil", "english", "hindi", "malayalam", "telugu"] = Field(
         ..., description="Language of the audio sample"
     )
-    
-    @validator('audio_base64')
-    def validate_base64(cls, v):
-        try:
-            base64.b64decode(v)
-            return v
-        except Exception:
-            raise ValueError("Invalid base64 encoding")
 
 
 class VoiceDetectionResponse(BaseModel):
@@ -66,7 +106,13 @@ class HealthResponse(BaseModel):
 
 # Authentication
 async def verify_api_key(api_key: str = Security(API_KEY_HEADER)):
-    if api_key not in VALID_API_KEYS:
+    # Constant-time comparison against every key (no early exit, so timing
+    # does not reveal which key matched)
+    candidate = api_key.encode()
+    valid = False
+    for key in VALID_API_KEYS:
+        valid |= hmac.compare_digest(candidate, key)
+    if not valid:
         raise HTTPException(
             status_code=403,
             detail="Invalid API Key"
@@ -75,36 +121,57 @@ async def verify_api_key(api_key: str = Security(API_KEY_HEADER)):
 
 
 # Feature Extraction Functions
+def mean_std(a, axis=-1):
+    """Mean and std along an axis from one sum and one sum-of-squares pass"""
+    n = a.shape[axis]
+    s1 = a.sum(axis=axis, dtype=np.float64)
+    s2 = np.einsum('...i,...i->...', np.moveaxis(a, axis, -1), np.moveaxis(a, axis, -1), dtype=np.float64)
+    mean = s1 / n
+    return mean, np.sqrt(np.maximum(s2 / n - mean * mean, 0.0))
+
+
+@lru_cache(maxsize=8)
+def mfcc_bases(sr, n_fft=2048, n_mels=128, n_mfcc=40):
+    """Mel filterbank and orthonormal DCT-II matrix, built once per sample rate"""
+    mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+    dct_basis = scipy.fft.dct(np.eye(n_mels, dtype=np.float32), type=2, norm='ortho', axis=0)[:n_mfcc]
+    return mel_basis, dct_basis
+
+
 class AudioFeatureExtractor:
     """Extract features for AI/Human classification"""
     
     @staticmethod
-    def extract_mfcc_features(audio, sr):
-        """Extract MFCC features"""
-        mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=40)
-        mfcc_mean = np.mean(mfccs, axis=1)
-        mfcc_std = np.std(mfccs, axis=1)
+    def extract_mfcc_features(audio, sr, S=None):
+        """Extract MFCC features (S: optional precomputed magnitude STFT)"""
+        if S is None:
+            S = np.abs(librosa.stft(audio, n_fft=2048, hop_length=512))
+        mel_basis, dct_basis = mfcc_bases(sr)
+        mfccs = dct_basis @ librosa.power_to_db(mel_basis @ S**2)
+        mfcc_mean, mfcc_std = mean_std(mfccs, axis=1)
         return np.concatenate([mfcc_mean, mfcc_std])
     
     @staticmethod
     def extract_prosodic_features(audio, sr):
         """Extract prosodic features (pitch, energy)"""
         # Pitch (F0)
-        pitches, magnitudes = librosa.piptrack(y=audio, sr=sr)
-        pitch_values = []
-        for t in range(pitches.shape[1]):
-            index = magnitudes[:, t].argmax()
-            pitch = pitches[index, t]
-            if pitch > 0:
-                pitch_values.append(pitch)
+        # YIN gives one F0 per frame directly, without piptrack's full
+        # pitch/magnitude matrices. Speech F0 is 50-500 Hz, so it runs on a
+        # 6 kHz copy (85 ms frames, 21 ms hop) - full-rate YIN is slower
+        # than piptrack, decimated YIN is faster
+        pitch_sr = 6000
+        pitch_audio = librosa.resample(audio, orig_sr=sr, target_sr=pitch_sr, res_type='soxr_qq')
+        pitch_values = librosa.yin(
+            pitch_audio, fmin=50, fmax=500, sr=pitch_sr, frame_length=512, hop_length=128
+        )
+        pitch_values = pitch_values[np.isfinite(pitch_values) & (pitch_values > 0)]
         
-        pitch_mean = np.mean(pitch_values) if pitch_values else 0
-        pitch_std = np.std(pitch_values) if pitch_values else 0
+        pitch_mean = pitch_values.mean() if pitch_values.size else 0
+        pitch_std = pitch_values.std() if pitch_values.size else 0
         
         # Energy
         energy = librosa.feature.rms(y=audio)[0]
-        energy_mean = np.mean(energy)
-        energy_std = np.std(energy)
+        energy_mean, energy_std = mean_std(energy)
         
         # Speaking rate (zero crossing rate)
         zcr = librosa.feature.zero_crossing_rate(audio)[0]
@@ -113,29 +180,34 @@ class AudioFeatureExtractor:
         return np.array([pitch_mean, pitch_std, energy_mean, energy_std, zcr_mean])
     
     @staticmethod
-    def extract_spectral_features(audio, sr):
-        """Extract spectral features"""
-        spectral_centroids = librosa.feature.spectral_centroid(y=audio, sr=sr)[0]
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=audio, sr=sr)[0]
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=audio, sr=sr)[0]
-        
-        return np.array([
-            np.mean(spectral_centroids),
-            np.std(spectral_centroids),
-            np.mean(spectral_rolloff),
-            np.std(spectral_rolloff),
-            np.mean(spectral_bandwidth),
-            np.std(spectral_bandwidth)
+    def extract_spectral_features(audio, sr, S=None):
+        """Extract spectral features (S: optional precomputed magnitude STFT)"""
+        if S is None:
+            S = np.abs(librosa.stft(audio, n_fft=2048, hop_length=512))
+        spectral = np.concatenate([
+            librosa.feature.spectral_centroid(S=S, sr=sr),
+            librosa.feature.spectral_rolloff(S=S, sr=sr),
+            librosa.feature.spectral_bandwidth(S=S, sr=sr)
         ])
+        
+        # [centroid mean, centroid std, rolloff mean, rolloff std, bandwidth mean, bandwidth std]
+        spectral_mean, spectral_std = mean_std(spectral, axis=1)
+        return np.stack([spectral_mean, spectral_std], axis=1).ravel()
     
     @staticmethod
     def extract_all_features(audio, sr):
         """Combine all features"""
-        mfcc = AudioFeatureExtractor.extract_mfcc_features(audio, sr)
+        # float32 end to end: half the bytes per reduction, twice the SIMD lanes
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        
+        # One STFT shared by the MFCC and spectral features
+        S = np.abs(librosa.stft(audio, n_fft=2048, hop_length=512)).astype(np.float32, copy=False)
+        
+        mfcc = AudioFeatureExtractor.extract_mfcc_features(audio, sr, S=S)
         prosody = AudioFeatureExtractor.extract_prosodic_features(audio, sr)
-        spectral = AudioFeatureExtractor.extract_spectral_features(audio, sr)
+        spectral = AudioFeatureExtractor.extract_spectral_features(audio, sr, S=S)
         
-        return np.concatenate([mfcc, prosody, spectral])
+        return np.concatenate([mfcc, prosody, spectral]).astype(np.float32)
 
 
 # Mock Classifier (Replace with trained model)
@@ -175,8 +247,7 @@ class VoiceClassifier:
             ai_score += 0.3
         
         # Random component for demo (remove in production)
-        import random
-        ai_score += random.uniform(0, 0.4)
+        ai_score += _RNG.random() * 0.4
         
         # Determine prediction
         is_ai = ai_score > 0.5
@@ -192,6 +263,51 @@ classifier = VoiceClassifier()
 feature_extractor = AudioFeatureExtractor()
 
 
+def _init_worker():
+    """
+    Pool worker initializer: run the extractor once on a short noise signal
+    so librosa's lazy imports and JIT compiles happen before the first request
+    """
+    audio = (np.random.default_rng(0).standard_normal(22050) * 0.1).astype(np.float32)
+    feature_extractor.extract_all_features(audio, 22050)
+
+
+def _warm_up():
+    """No-op task that makes a pool worker start (and run its initializer)"""
+
+
+def _run_pipeline(audio_bytes: bytes, language: str):
+    """
+    Load, validate, extract features and classify (runs in a worker process)
+    
+    Returns:
+        (prediction, confidence, audio_duration)
+    """
+    # Load audio with libsndfile (WAV/FLAC/OGG/MP3); librosa/audioread
+    # only for formats it cannot decode
+    try:
+        audio, sr = sf.read(io.BytesIO(audio_bytes), dtype='float32')
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+    except RuntimeError:
+        audio, sr = librosa.load(io.BytesIO(audio_bytes), sr=None)
+    audio_duration = len(audio) / sr
+    
+    # Validate audio duration (1-60 seconds)
+    if audio_duration < 1 or audio_duration > 60:
+        raise ValueError(
+            f"Audio duration must be between 1-60 seconds. Got {audio_duration:.2f}s"
+        )
+    
+    # Extract features
+    features = feature_extractor.extract_all_features(audio, sr)
+    
+    # Classify
+    prediction, confidence = classifier.predict(features, language)
+    
+    return prediction, confidence, audio_duration
+
+
 # API Endpoints
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -219,31 +335,29 @@ async def detect_voice(
         prediction: AI_GENERATED or HUMAN
         confidence: Confidence score (0.0 to 1.0)
     """
-    start_time = datetime.utcnow()
+    start_time = time.perf_counter()
     
     try:
-        # Decode base64 audio
-        audio_bytes = base64.b64decode(request.audio_base64)
+        if len(request.audio_base64) > MAX_AUDIO_BASE64:
+            raise HTTPException(status_code=400, detail="File too large. Maximum size: 10MB")
         
-        # Load audio with librosa
-        audio, sr = librosa.load(io.BytesIO(audio_bytes), sr=None)
-        audio_duration = librosa.get_duration(y=audio, sr=sr)
+        # Decode base64 audio (once, here - not in a validator as well)
+        try:
+            audio_bytes = pybase64.b64decode(request.audio_base64, validate=False)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid base64 encoding")
         
-        # Validate audio duration (1-60 seconds)
-        if audio_duration < 1 or audio_duration > 60:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Audio duration must be between 1-60 seconds. Got {audio_duration:.2f}s"
+        # Load, extract features and classify in the process pool
+        loop = asyncio.get_running_loop()
+        try:
+            prediction, confidence, audio_duration = await loop.run_in_executor(
+                process_pool, _run_pipeline, audio_bytes, request.language
             )
-        
-        # Extract features
-        features = feature_extractor.extract_all_features(audio, sr)
-        
-        # Classify
-        prediction, confidence = classifier.predict(features, request.language)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Calculate processing time
-        processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+        processing_time = (time.perf_counter() - start_time) * 1000
         
         # Log request
         logger.info(f"Detection: {prediction} | Confidence: {confidence:.3f} | Language: {request.language}")
@@ -8,6 +8,7 @@ import base64
 import requests
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any
 
@@ -22,10 +23,13 @@ class VoiceDetectionClient:
             "X-API-Key": api_key,
             "Content-Type": "application/json"
         }
+        # One keep-alive connection pool for every request this client makes
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
     
     def health_check(self) -> Dict[str, Any]:
         """Check API health"""
-        response = requests.get(f"{self.base_url}/health")
+        response = self._session.get(f"{self.base_url}/health")
         response.raise_for_status()
         return response.json()
     
@@ -53,9 +57,8 @@ class VoiceDetectionClient:
         }
         
         start_time = time.time()
-        response = requests.post(
+        response = self._session.post(
             f"{self.base_url}/detect",
-            headers=self.headers,
             json=payload
         )
         elapsed_time = (time.time() - start_time) * 1000
@@ -66,15 +69,20 @@ class VoiceDetectionClient:
         
         return result
     
-    def batch_detect(self, audio_files: list, language: str) -> list:
-        """Detect multiple audio files"""
+    def batch_detect(self, audio_files: list, language: str, max_workers: int = 8) -> list:
+        """Detect multiple audio files concurrently (results in input order)"""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self.detect_voice, audio_file, language)
+                for audio_file in audio_files
+            ]
+        
         results = []
-        for audio_file in audio_files:
+        for audio_file, future in zip(audio_files, futures):
             try:
-                result = self.detect_voice(audio_file, language)
                 results.append({
                     'file': audio_file,
-                    'result': result
+                    'result': future.result()
                 })
             except Exception as e:
                 results.append({
@@ -5,7 +5,9 @@ Run with: pytest tests/ -v
 
 import pytest
 import numpy as np
+import asyncio
 import base64
+import httpx
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 
@@ -13,40 +15,57 @@ from unittest.mock import patch, MagicMock
 import sys
 sys.path.insert(0, '.')
 
+import app_main
 from app_main import app
 from app.audio_processor import AudioProcessor
+from app.features_numba import pitch_stats, row_mean_std, voiced_pitch
 from app.classifier import MockVoiceClassifier
-from app.models import VoiceDetectionRequest, VoiceDetectionResponse
+from app.auth import RateLimiter
+from app.cache import FeatureCache, LRUCache, content_key
+from app.batching import PredictionBatcher
+from app.pipeline import run_pipeline, InvalidAudioError
+from app.config import settings
+from app.models import VoiceDetectionRequest, VoiceDetectionResponse, decode_b64_streaming, B64_CHUNK_SIZE
 
 
 # ============== FIXTURES ==============
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def client():
-    """Create test client"""
-    return TestClient(app)
+    """
+    Test client with the app lifespan run once per test worker
+    Extraction runs in-process (no worker pool), so tests can patch it
+    """
+    with patch.object(settings, "pipeline_workers", 0), TestClient(app) as test_client:
+        yield test_client
 
 
 @pytest.fixture
+def clear_caches(client):
+    """Empty the result / feature caches, which otherwise live for the whole session"""
+    app_main.result_cache.clear()
+    app_main.feature_cache.clear()
+
+
+@pytest.fixture(scope="session")
 def api_key():
     """Valid API key for testing"""
     return "demo_key_12345"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def audio_processor():
     """Audio processor instance"""
     return AudioProcessor()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_classifier():
     """Mock classifier instance"""
     return MockVoiceClassifier()
 
 
-@pytest.fixture
-def sample_audio_base64():
+def _build_sample_audio_base64():
     """
     Generate a simple test audio as base64
     Creates a 2-second sine wave at 440Hz
@@ -77,6 +96,16 @@ def sample_audio_base64():
     return base64.b64encode(audio_bytes).decode('utf-8')
 
 
+# Deterministic, so built once at import rather than per fixture request
+_SAMPLE_AUDIO_BASE64 = _build_sample_audio_base64()
+
+
+@pytest.fixture(scope="session")
+def sample_audio_base64():
+    """2-second 440Hz sine WAV as base64"""
+    return _SAMPLE_AUDIO_BASE64
+
+
 # ============== API ENDPOINT TESTS ==============
 
 class TestHealthEndpoint:
@@ -113,9 +142,20 @@ class TestRootEndpoint:
         assert "supported_languages" in data
 
 
+@pytest.mark.usefixtures("clear_caches")
 class TestDetectEndpoint:
     """Tests for /detect endpoint"""
     
+    @pytest.fixture(autouse=True)
+    def mock_feature_extraction(self):
+        """API contract only: feature values are covered by TestAudioProcessor"""
+        with patch.object(
+            AudioProcessor,
+            "extract_all_features",
+            return_value=np.zeros(127, dtype=np.float32)
+        ) as extract:
+            yield extract
+    
     def test_detect_requires_api_key(self, client, sample_audio_base64):
         """Detection requires API key"""
         response = client.post(
@@ -158,6 +198,50 @@ class TestDetectEndpoint:
         assert "processing_time_ms" in data
         assert "audio_duration_seconds" in data
     
+    def test_detect_result_cache(self, client, api_key, sample_audio_base64, mock_feature_extraction):
+        """Repeat audio + language is a cache HIT; another language is a MISS that reuses the features"""
+        def detect(language):
+            return client.post(
+                "/detect",
+                headers={"X-API-Key": api_key},
+                json={"audio_base64": sample_audio_base64, "language": language}
+            )
+        
+        first, repeat, other_language = detect("english"), detect("english"), detect("tamil")
+        
+        assert [r.status_code for r in (first, repeat, other_language)] == [200, 200, 200]
+        assert first.headers["X-Cache"] == "MISS"
+        assert repeat.headers["X-Cache"] == "HIT"
+        assert repeat.json()["prediction"] == first.json()["prediction"]
+        assert repeat.json()["confidence"] == first.json()["confidence"]
+        assert other_language.headers["X-Cache"] == "MISS"
+        assert other_language.json()["language"] == "tamil"
+        assert mock_feature_extraction.call_count == 1  # feature cache hit for tamil
+    
+    def test_detect_without_batcher_classifies_off_the_event_loop(self, client, api_key, sample_audio_base64):
+        """With micro-batching disabled, classifier.predict runs in the executor"""
+        on_event_loop = []
+        
+        def predict(features, language):
+            try:
+                asyncio.get_running_loop()
+                on_event_loop.append(True)
+            except RuntimeError:
+                on_event_loop.append(False)
+            return "HUMAN", 0.9
+        
+        with patch.object(app_main, "prediction_batcher", None), \
+                patch.object(app_main.classifier, "predict", side_effect=predict):
+            response = client.post(
+                "/detect",
+                headers={"X-API-Key": api_key},
+                json={"audio_base64": sample_audio_base64, "language": "english"}
+            )
+        
+        assert response.status_code == 200
+        assert response.json()["prediction"] == "HUMAN"
+        assert on_event_loop == [False]
+    
     def test_detect_rejects_invalid_base64(self, client, api_key):
         """Detection rejects invalid base64"""
         response = client.post(
@@ -183,19 +267,78 @@ class TestDetectEndpoint:
         assert response.status_code == 422
     
     def test_detect_all_supported_languages(self, client, api_key, sample_audio_base64):
-        """Detection works for all supported languages"""
+        """Detection works for all supported languages (requests sent concurrently)"""
         languages = ["tamil", "english", "hindi", "malayalam", "telugu"]
         
-        for lang in languages:
+        async def detect_all():
+            # Runs on the test client's event loop, where the app lifespan ran
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+                return await asyncio.gather(*[
+                    async_client.post(
+                        "/detect",
+                        headers={"X-API-Key": api_key},
+                        json={
+                            "audio_base64": sample_audio_base64,
+                            "language": lang
+                        }
+                    )
+                    for lang in languages
+                ])
+        
+        responses = client.portal.call(detect_all)
+        
+        for lang, response in zip(languages, responses):
+            assert response.status_code == 200, f"Failed for language: {lang}"
+            assert response.json()["language"] == lang
+    
+    def test_detect_batch_rejects_oversized_batch(self, client, api_key, sample_audio_base64):
+        """Batch detection rejects more items than MAX_BATCH_SIZE without decoding any"""
+        item = {"audio_base64": sample_audio_base64, "language": "english"}
+        with patch("app.models.decode_b64_streaming") as decode:
+            response = client.post(
+                "/detect/batch",
+                headers={"X-API-Key": api_key},
+                json={"items": [item] * (settings.max_batch_size + 1)}
+            )
+        assert response.status_code == 422
+        assert decode.call_count == 0
+    
+    def test_detect_file_rejects_invalid_language(self, client, api_key, sample_audio_base64):
+        """File upload endpoint validates the language form field"""
+        response = client.post(
+            "/detect/file",
+            headers={"X-API-Key": api_key},
+            files={"file": ("sample.wav", base64.b64decode(sample_audio_base64), "audio/wav")},
+            data={"language": "french"}
+        )
+        assert response.status_code == 422
+    
+    def test_detect_file_rejects_oversized_upload(self, client, api_key):
+        """File uploads over the size limit are rejected without reading them whole"""
+        with patch.object(settings, "max_file_size_mb", 1):
+            response = client.post(
+                "/detect/file",
+                headers={"X-API-Key": api_key},
+                files={"file": ("large.wav", b"\0" * (1024 * 1024 * 2), "audio/wav")},
+                data={"language": "english"}
+            )
+        assert response.status_code == 400
+        assert "too large" in response.json()["detail"]
+    
+    def test_detect_rejects_oversized_base64_before_decoding(self, client, api_key):
+        """Payloads over the size limit are rejected from their base64 length"""
+        with patch.object(settings, "max_file_size_mb", 1):
+            request = VoiceDetectionRequest(audio_base64="A" * (1024 * 1024 * 2), language="english")
+            assert len(request.audio_bytes) == 0  # never decoded
+            
             response = client.post(
                 "/detect",
                 headers={"X-API-Key": api_key},
-                json={
-                    "audio_base64": sample_audio_base64,
-                    "language": lang
-                }
+                json={"audio_base64": request.audio_base64, "language": "english"}
             )
-            assert response.status_code == 200, f"Failed for language: {lang}"
+        assert response.status_code == 400
+        assert "too large" in response.json()["detail"]
 
 
 # ============== AUDIO PROCESSING TESTS ==============
@@ -244,6 +387,41 @@ class TestAudioProcessor:
         # Total features: 80 + 10 + 6 + 3 + 4 + 24 = 127
         assert len(features) >= 100
         assert features.dtype == np.float32
+    
+    def test_extract_features_batch_matches_single(self, audio_processor):
+        """Batched extraction matches per-signal extraction for mixed lengths"""
+        sr = 22050
+        audios = [
+            np.random.randn(22050 * 2).astype(np.float32),
+            np.random.randn(22050 * 3 + 123).astype(np.float32)
+        ]
+        
+        batch = audio_processor.extract_features_batch(audios, sr)
+        single = np.stack([audio_processor.extract_all_features(a, sr) for a in audios])
+        
+        assert batch.shape == single.shape
+        np.testing.assert_allclose(batch, single, rtol=1e-4, atol=1e-5)
+    
+    def test_numba_kernels_match_numpy(self):
+        """Numba aggregation kernels match the NumPy reductions they replace"""
+        x = np.random.rand(40, 87).astype(np.float32)
+        mean, std = row_mean_std(x)
+        np.testing.assert_allclose(mean, x.mean(axis=1), rtol=1e-5)
+        np.testing.assert_allclose(std, x.std(axis=1), rtol=1e-4)
+        
+        pitches = np.random.rand(16, 50).astype(np.float32)
+        pitches[:, ::3] = 0  # unvoiced frames
+        magnitudes = np.random.rand(16, 50).astype(np.float32)
+        expected = pitches[magnitudes.argmax(axis=0), np.arange(50)]
+        pitch_values = voiced_pitch(pitches, magnitudes)
+        np.testing.assert_array_equal(pitch_values, expected[expected > 0])
+        
+        np.testing.assert_allclose(
+            pitch_stats(pitch_values),
+            [pitch_values.mean(), pitch_values.std(), np.ptp(pitch_values)],
+            rtol=1e-4
+        )
+        assert pitch_stats(pitch_values[:0]) == (0.0, 0.0, 0.0)
 
 
 # ============== CLASSIFIER TESTS ==============
@@ -269,6 +447,24 @@ class TestMockClassifier:
         for lang in languages:
             prediction, confidence = mock_classifier.predict(features, lang)
             assert prediction in ["AI_GENERATED", "HUMAN"]
+    
+    def test_predict_is_deterministic_without_jitter(self):
+        """Same features give the same result when jitter is disabled"""
+        classifier = MockVoiceClassifier(add_jitter=False)
+        features = np.random.randn(127).astype(np.float32)
+        
+        assert classifier.predict(features, "english") == classifier.predict(features, "english")
+    
+    def test_predict_batch_returns_one_result_per_row(self, mock_classifier):
+        """Batch prediction returns a result for every feature row"""
+        features = np.random.randn(4, 127).astype(np.float32)
+        
+        results = mock_classifier.predict_batch(features, ["english"] * 4)
+        
+        assert len(results) == 4
+        for prediction, confidence in results:
+            assert prediction in ["AI_GENERATED", "HUMAN"]
+            assert 0 <= confidence <= 1
 
 
 # ============== MODEL VALIDATION TESTS ==============
@@ -283,6 +479,7 @@ class TestRequestModels:
             language="english"
         )
         assert request.language == "english"
+        assert request.audio_bytes == base64.b64decode(sample_audio_base64)
     
     def test_invalid_language_rejected(self, sample_audio_base64):
         """Invalid language is rejected"""
@@ -291,10 +488,24 @@ class TestRequestModels:
                 audio_base64=sample_audio_base64,
                 language="french"
             )
+    
+    def test_decode_b64_streaming_matches_b64decode(self):
+        """Chunked decode matches a one-shot decode, including wrapped input"""
+        raw = np.random.default_rng(0).bytes(200_000)
+        
+        assert decode_b64_streaming(base64.b64encode(raw).decode()) == raw
+        assert decode_b64_streaming(base64.encodebytes(raw).decode()) == raw
+        
+        # Padding that ends a chunk mid-string is rejected like the one-shot
+        # decode, rather than returning a zero-filled tail
+        with pytest.raises(ValueError):
+            decode_b64_streaming("A" * (B64_CHUNK_SIZE - 4) + "QQ==" + "QUFB")
 
 
 # ============== RATE LIMITING TESTS ==============
 
+@pytest.mark.xdist_group("rate_limit")
+@pytest.mark.usefixtures("clear_caches")
 class TestRateLimiting:
     """Tests for rate limiting"""
     
@@ -311,6 +522,113 @@ class TestRateLimiting:
         
         # Rate limit headers should be present on successful requests
         assert response.status_code == 200
+    
+    @pytest.mark.asyncio
+    async def test_rate_limiter_enforces_minute_limit(self):
+        """Requests beyond the per-minute limit are rejected"""
+        limiter = RateLimiter()
+        limiter.limits['per_minute'] = 3
+        
+        results = [(await limiter.check_rate_limit("test_key"))[0] for _ in range(5)]
+        
+        assert results == [True, True, True, False, False]
+        remaining = await limiter.get_remaining("test_key")
+        assert remaining['remaining_per_minute'] == 0
+        assert remaining['remaining_per_hour'] == limiter.limits['per_hour'] - 3
+
+
+# ============== PIPELINE TESTS ==============
+
+class TestPipeline:
+    """Tests for the worker-side extraction pipeline"""
+    
+    def test_run_pipeline_returns_features_and_duration(self, sample_audio_base64):
+        """Pipeline returns a feature vector and the audio duration"""
+        features, duration = run_pipeline(base64.b64decode(sample_audio_base64))
+        
+        assert features.ndim == 1
+        assert len(features) >= 100
+        assert duration == pytest.approx(2.0, abs=0.01)
+    
+    def test_run_pipeline_rejects_invalid_audio(self):
+        """Undecodable audio raises InvalidAudioError (mapped to 400)"""
+        with pytest.raises(InvalidAudioError):
+            run_pipeline(b"not audio" * 20)
+
+
+# ============== FEATURE CACHE TESTS ==============
+
+class TestFeatureCache:
+    """Tests for the content-addressed feature cache"""
+    
+    def test_content_key_depends_on_content(self):
+        """Identical bytes share a key, different bytes do not"""
+        assert content_key(b"abc") == content_key(b"abc")
+        assert content_key(b"abc") != content_key(b"abd")
+    
+    @pytest.mark.asyncio
+    async def test_cache_round_trip_and_eviction(self):
+        """Cached features are returned and the oldest entry is evicted"""
+        cache = FeatureCache(max_entries=2)
+        features = np.arange(5, dtype=np.float32)
+        
+        await cache.set("a", features, 1.5)
+        await cache.set("b", features, 2.0)
+        await cache.set("c", features, 2.5)
+        
+        assert await cache.get("a") is None
+        cached_features, duration = await cache.get("c")
+        np.testing.assert_array_equal(cached_features, features)
+        assert duration == 2.5
+    
+    def test_lru_cache_expires_entries(self):
+        """Entries older than the TTL are treated as misses"""
+        cache = LRUCache(max_entries=4, ttl=0)
+        cache.set(("abc", "english"), ("HUMAN", 0.9, 2.0))
+        
+        assert cache.get(("abc", "english")) is None
+
+
+# ============== PREDICTION BATCHING TESTS ==============
+
+class TestPredictionBatcher:
+    """Tests for /detect prediction micro-batching"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_predictions_share_one_call(self):
+        """Predictions queued within the window go to predict_batch together"""
+        calls = []
+        
+        def predict_batch(features, languages):
+            calls.append(len(languages))
+            return [("HUMAN", float(row[0])) for row in features]
+        
+        batcher = PredictionBatcher(predict_batch, max_batch_size=8, max_wait=0.05)
+        batcher.start()
+        try:
+            results = await asyncio.gather(*[
+                batcher.predict(np.full(4, i, dtype=np.float32), "english")
+                for i in range(3)
+            ])
+        finally:
+            await batcher.stop()
+        
+        assert calls == [3]
+        assert results == [("HUMAN", 0.0), ("HUMAN", 1.0), ("HUMAN", 2.0)]
+    
+    @pytest.mark.asyncio
+    async def test_lone_prediction_skips_the_window(self):
+        """A prediction with nothing else queued is not held for max_wait"""
+        batcher = PredictionBatcher(lambda features, languages: [("HUMAN", 0.9)], max_wait=10.0)
+        batcher.start()
+        try:
+            result = await asyncio.wait_for(
+                batcher.predict(np.zeros(4, dtype=np.float32), "english"), timeout=1.0
+            )
+        finally:
+            await batcher.stop()
+        
+        assert result == ("HUMAN", 0.9)
 
 
 # ============== RUN TESTS ==============
@@ -5,13 +5,19 @@ Implements ensemble approach with multiple classifiers
 
 import numpy as np
 import librosa
+import soundfile as sf
+import soxr
 import os
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.svm import SVC
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.svm import LinearSVC
+from sklearn.kernel_approximation import Nystroem
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
 import joblib
+from joblib import Parallel, delayed
 import json
 from pathlib import Path
 import logging
@@ -19,13 +25,22 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bump FEATURE_VERSION whenever extract_features changes what it computes;
+# cached features from another version (or width) are re-extracted
+FEATURE_VERSION = 1
+N_FEATURES = 118
+
 
 class VoiceDatasetLoader:
     """Load and preprocess voice dataset"""
     
-    def __init__(self, data_dir):
+    def __init__(self, data_dir, n_jobs=-1, sample_rate=16000, cache_path=None):
         self.data_dir = Path(data_dir)
         self.languages = ['tamil', 'english', 'hindi', 'malayalam', 'telugu']
+        self.n_jobs = n_jobs  # feature extraction processes (-1 = all cores)
+        self.sample_rate = sample_rate  # every file is resampled to this rate
+        # Extracted features from earlier runs, keyed by (path, mtime)
+        self.cache_path = Path(cache_path) if cache_path else self.data_dir / "feature_cache.npz"
         
     def load_dataset(self):
         """
@@ -44,10 +59,8 @@ class VoiceDatasetLoader:
               ├── malayalam/
               └── telugu/
         """
-        X = []
-        y = []
-        languages = []
-        
+        # Flat (path, label, language) list, so files are extracted in parallel
+        files = []
         for label_dir in ['ai_generated', 'human']:
             label = 1 if label_dir == 'ai_generated' else 0
             
@@ -58,54 +71,150 @@ class VoiceDatasetLoader:
                     logger.warning(f"Directory not found: {audio_dir}")
                     continue
                 
-                for audio_file in audio_dir.glob('*.mp3'):
-                    try:
-                        features = self.extract_features(str(audio_file))
-                        X.append(features)
-                        y.append(label)
-                        languages.append(lang)
-                        logger.info(f"Processed: {audio_file.name}")
-                    except Exception as e:
-                        logger.error(f"Error processing {audio_file}: {e}")
-        
-        return np.array(X), np.array(y), languages
+                files.extend(
+                    (str(audio_file), audio_file.stat().st_mtime, label, lang)
+                    for audio_file in audio_dir.glob('*.mp3')
+                )
+        
+        # Only new or modified files need extracting
+        cache = self._load_feature_cache()
+        pending = [(path, mtime) for path, mtime, _, _ in files if (path, mtime) not in cache]
+        logger.info(f"{len(files) - len(pending)}/{len(files)} files cached, extracting {len(pending)}")
+        
+        # Files are independent and extraction is CPU-bound: one loky process per core
+        results = Parallel(n_jobs=self.n_jobs, backend='loky', batch_size=8)(
+            delayed(_extract_or_none)(path, self.sample_rate) for path, _ in pending
+        )
+        for key, features in zip(pending, results):
+            if features is not None:
+                cache[key] = features
+        
+        X = []
+        y = []
+        languages = []
+        for path, mtime, label, lang in files:
+            features = cache.get((path, mtime))
+            if features is None:
+                continue
+            X.append(features)
+            y.append(label)
+            languages.append(lang)
+        
+        if pending:
+            self._save_feature_cache({(path, mtime): cache[(path, mtime)]
+                                      for path, mtime, _, _ in files if (path, mtime) in cache})
+        
+        logger.info(f"Loaded {len(X)}/{len(files)} files")
+        return np.array(X, dtype=np.float32), np.array(y), languages
+    
+    def _load_feature_cache(self):
+        """{(path, mtime): features} saved by an earlier run with the same features and sample rate"""
+        if not self.cache_path.exists():
+            return {}
+        try:
+            with np.load(self.cache_path) as data:
+                if ('feature_version' not in data
+                        or int(data['feature_version']) != FEATURE_VERSION
+                        or data['features'].shape[1] != N_FEATURES
+                        or int(data['sample_rate']) != self.sample_rate):
+                    logger.info(f"Feature cache {self.cache_path} is out of date, re-extracting")
+                    return {}
+                return {
+                    (str(path), float(mtime)): row
+                    for path, mtime, row in zip(data['paths'], data['mtimes'], data['features'])
+                }
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable feature cache {self.cache_path}: {e}")
+            return {}
+    
+    def _save_feature_cache(self, cache):
+        """Write the cache (current files only), replacing the old file atomically"""
+        if not cache:
+            return
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                paths=np.array([path for path, _ in cache]),
+                mtimes=np.array([mtime for _, mtime in cache]),
+                features=np.stack(list(cache.values())),
+                sample_rate=self.sample_rate,
+                feature_version=FEATURE_VERSION
+            )
+        os.replace(tmp_path, self.cache_path)
     
-    def extract_features(self, audio_path):
-        """Extract comprehensive features from audio"""
-        audio, sr = librosa.load(audio_path, sr=None, duration=30)
+    @staticmethod
+    def load_audio(audio_path, sample_rate=16000, duration=30):
+        """
+        Decode the first `duration` seconds as mono float32 at sample_rate
+        
+        libsndfile reads only the frames needed and soxr resamples directly;
+        librosa (audioread) is kept as the fallback for formats libsndfile
+        cannot open.
+        """
+        try:
+            with sf.SoundFile(audio_path) as f:
+                sr = f.samplerate
+                audio = f.read(frames=int(sr * duration), dtype='float32')
+        except RuntimeError:
+            audio, sr = librosa.load(
+                audio_path, sr=None, mono=True, duration=duration, dtype=np.float32
+            )
+        
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+        if sr != sample_rate:
+            audio = soxr.resample(
+                np.ascontiguousarray(audio, dtype=np.float32), sr, sample_rate, quality='HQ'
+            )
+        
+        return audio, sample_rate
+    
+    @staticmethod
+    def extract_features(audio_path, sample_rate=16000):
+        """Extract comprehensive features from audio (mono, resampled to sample_rate, first 30 s)"""
+        # A fixed rate keeps features comparable across files and bounds the
+        # FFT work: 44.1/48 kHz sources would otherwise carry ~3x the samples
+        audio, sr = VoiceDatasetLoader.load_audio(audio_path, sample_rate)
         
         features = []
         
+        # One STFT (librosa defaults: n_fft=2048, hop=512) shared by every
+        # spectral feature below instead of one per feature
+        S = np.abs(librosa.stft(audio))
+        S_power = S ** 2
+        
         # 1. MFCC features (40 coefficients)
-        mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=40)
+        mel = librosa.feature.melspectrogram(S=S_power, sr=sr)
+        mfccs = librosa.feature.mfcc(S=librosa.power_to_db(mel), n_mfcc=40)
         features.extend(np.mean(mfccs, axis=1))
         features.extend(np.std(mfccs, axis=1))
         
         # 2. Chroma features
-        chroma = librosa.feature.chroma_stft(y=audio, sr=sr)
+        chroma = librosa.feature.chroma_stft(S=S_power, sr=sr)
         features.extend(np.mean(chroma, axis=1))
         features.extend(np.std(chroma, axis=1))
         
         # 3. Spectral features
-        spectral_centroids = librosa.feature.spectral_centroid(y=audio, sr=sr)[0]
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=audio, sr=sr)[0]
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=audio, sr=sr)[0]
-        
-        features.extend([
-            np.mean(spectral_centroids), np.std(spectral_centroids),
-            np.mean(spectral_rolloff), np.std(spectral_rolloff),
-            np.mean(spectral_bandwidth), np.std(spectral_bandwidth)
+        spectral = np.concatenate([
+            librosa.feature.spectral_centroid(S=S, sr=sr),
+            librosa.feature.spectral_rolloff(S=S, sr=sr),
+            librosa.feature.spectral_bandwidth(S=S, sr=sr)
         ])
         
+        # [centroid mean, centroid std, rolloff mean, rolloff std, bandwidth mean, bandwidth std]
+        features.extend(np.stack([spectral.mean(axis=1), spectral.std(axis=1)], axis=1).ravel())
+        
         # 4. Prosodic features
-        pitches, magnitudes = librosa.piptrack(y=audio, sr=sr)
-        pitch_values = [pitches[magnitudes[:, t].argmax(), t] 
-                       for t in range(pitches.shape[1]) 
-                       if pitches[magnitudes[:, t].argmax(), t] > 0]
+        pitches, magnitudes = librosa.piptrack(S=S, sr=sr)
+        # Strongest bin per frame: one argmax + fancy index, voiced frames only
+        index = magnitudes.argmax(axis=0)
+        pitch_values = pitches[index, np.arange(pitches.shape[1])]
+        pitch_values = pitch_values[pitch_values > 0]
         
         features.extend([
-            np.mean(pitch_values) if pitch_values else 0,
-            np.std(pitch_values) if pitch_values else 0
+            pitch_values.mean() if pitch_values.size else 0,
+            pitch_values.std() if pitch_values.size else 0
         ])
         
         # 5. Energy
@@ -116,18 +225,36 @@ class VoiceDatasetLoader:
         zcr = librosa.feature.zero_crossing_rate(audio)[0]
         features.extend([np.mean(zcr), np.std(zcr)])
         
-        # 7. Harmonic-to-Noise Ratio (approximation)
-        harmonic, percussive = librosa.effects.hpss(audio)
-        hnr = np.mean(harmonic) / (np.mean(percussive) + 1e-6)
+        # 7. Harmonic-to-Noise Ratio from the autocorrelation peak in the
+        # 50-500 Hz pitch lag range (same estimate as the API's processor)
+        acf = librosa.autocorrelate(audio, max_size=sr // 50)
+        peak = max(acf[sr // 500:].max(), 0.0)
+        hnr = 10 * np.log10((peak + 1e-10) / (acf[0] - peak + 1e-10))
         features.append(hnr)
         
         # 8. Temporal features
         # Silence ratio
         intervals = librosa.effects.split(audio, top_db=30)
-        silence_ratio = 1 - (sum([end - start for start, end in intervals]) / len(audio))
+        voiced = int((intervals[:, 1] - intervals[:, 0]).sum()) if intervals.size else 0
+        silence_ratio = 1.0 - voiced / len(audio)
         features.append(silence_ratio)
         
-        return np.array(features)
+        return np.asarray(features, dtype=np.float32)
+
+
+def _extract_or_none(audio_path, sample_rate):
+    """Extract features in a worker process; None (logged) if the file fails"""
+    try:
+        return VoiceDatasetLoader.extract_features(audio_path, sample_rate)
+    except Exception as e:
+        logger.error(f"Error processing {audio_path}: {e}")
+        return None
+
+
+def _fit_and_score(name, model, X_train, y_train, X_val):
+    """Fit one ensemble member (runs in a joblib worker) and return its validation probabilities"""
+    model.fit(X_train, y_train)
+    return name, model, model.predict_proba(X_val)[:, 1]
 
 
 class EnsembleVoiceClassifier:
@@ -142,47 +269,58 @@ class EnsembleVoiceClassifier:
                 random_state=42,
                 n_jobs=-1
             ),
-            'gradient_boosting': GradientBoostingClassifier(
-                n_estimators=150,
+            # Histogram-binned, multithreaded boosting
+            'gradient_boosting': HistGradientBoostingClassifier(
+                max_iter=300,
                 learning_rate=0.1,
                 max_depth=10,
                 random_state=42
             ),
-            'svm': SVC(
-                kernel='rbf',
-                C=10,
-                gamma='scale',
-                probability=True,
-                random_state=42
+            # RBF SVM approximated with Nystroem features + a linear SVM:
+            # O(N) to train instead of O(N^2); calibrated for predict_proba
+            'svm': CalibratedClassifierCV(
+                Pipeline([
+                    ('nystroem', Nystroem(kernel='rbf', n_components=500, random_state=42)),
+                    ('svc', LinearSVC(C=10, dual=False, random_state=42))
+                ]),
+                cv=5
             )
         }
         self.scaler = StandardScaler()
         self.weights = None
+        self._w_vec = None
+        self._mean32 = None
+        self._inv_scale32 = None
         
     def train(self, X_train, y_train, X_val, y_val):
         """Train all models and optimize ensemble weights"""
         
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_val_scaled = self.scaler.transform(X_val)
+        # Scale features (float32 end to end: half the memory for tree split search)
+        self._set_scaler(self.scaler.fit(np.asarray(X_train, dtype=np.float32)))
+        X_train_scaled = self._scale(X_train)
+        X_val_scaled = self._scale(X_val)
+        
+        # Train individual models, one process each: the fits are independent,
+        # so wall time is the slowest model rather than the sum. joblib
+        # memory-maps the (large) scaled matrices instead of copying them
+        logger.info(f"Training {', '.join(self.models)}...")
+        results = Parallel(n_jobs=len(self.models), backend='loky')(
+            delayed(_fit_and_score)(name, model, X_train_scaled, y_train, X_val_scaled)
+            for name, model in self.models.items()
+        )
         
-        # Train individual models
         val_predictions = {}
         
-        for name, model in self.models.items():
-            logger.info(f"Training {name}...")
-            model.fit(X_train_scaled, y_train)
-            
-            # Validation predictions
-            val_pred = model.predict_proba(X_val_scaled)[:, 1]
+        for name, model, val_pred in results:
+            self.models[name] = model
             val_predictions[name] = val_pred
             
             # Evaluate
-            val_acc = model.score(X_val_scaled, y_val)
+            val_acc = np.mean((val_pred > 0.5) == y_val)
             logger.info(f"{name} validation accuracy: {val_acc:.4f}")
         
         # Optimize ensemble weights using validation set
-        self.weights = self._optimize_weights(val_predictions, y_val)
+        self._set_weights(self._optimize_weights(val_predictions, y_val))
         logger.info(f"Optimized weights: {self.weights}")
         
         # Final ensemble evaluation
@@ -194,41 +332,68 @@ class EnsembleVoiceClassifier:
         """Optimize ensemble weights based on validation performance"""
         from scipy.optimize import minimize
         
+        # (n_models, n_samples): each candidate ensemble is one matrix-vector product
+        names = list(predictions_dict.keys())
+        predictions = np.stack([predictions_dict[name] for name in names])
+        y_true = np.asarray(y_true)
+        
         def objective(weights):
-            weights = weights / weights.sum()  # Normalize
-            ensemble = sum(w * predictions_dict[name] 
-                          for w, name in zip(weights, predictions_dict.keys()))
-            return -roc_auc_score(y_true, ensemble)
+            return -roc_auc_score(y_true, weights @ predictions)
         
-        n_models = len(predictions_dict)
+        n_models = len(names)
         initial_weights = np.ones(n_models) / n_models
         bounds = [(0, 1)] * n_models
+        # Weights stay on the simplex inside the solver instead of being renormalized per call
+        constraints = {'type': 'eq', 'fun': lambda w: w.sum() - 1}
         
-        result = minimize(objective, initial_weights, bounds=bounds)
-        optimized = result.x / result.x.sum()
+        result = minimize(
+            objective, initial_weights, method='SLSQP', bounds=bounds, constraints=constraints
+        )
+        optimized = np.clip(result.x, 0, None)
+        optimized = optimized / optimized.sum()
         
-        return {name: w for name, w in zip(predictions_dict.keys(), optimized)}
+        return {name: float(w) for name, w in zip(names, optimized)}
+    
+    def _set_scaler(self, scaler):
+        """Store the fitted scaler plus its mean / 1/scale as float32 vectors"""
+        self.scaler = scaler
+        self._mean32 = scaler.mean_.astype(np.float32)
+        self._inv_scale32 = (1.0 / scaler.scale_).astype(np.float32)
+    
+    def _scale(self, X):
+        """scaler.transform into one float32 buffer, without sklearn's per-call validation"""
+        X_scaled = np.array(X, dtype=np.float32)
+        np.subtract(X_scaled, self._mean32, out=X_scaled)
+        np.multiply(X_scaled, self._inv_scale32, out=X_scaled)
+        return X_scaled
+    
+    def _set_weights(self, weights):
+        """Store ensemble weights plus the same weights as a vector in model order"""
+        self.weights = weights
+        self._w_vec = np.array([weights[name] for name in self.models])
     
     def _ensemble_predict(self, predictions_dict):
-        """Weighted ensemble prediction"""
-        ensemble = sum(self.weights[name] * predictions_dict[name] 
-                      for name in predictions_dict.keys())
-        return ensemble
+        """Weighted ensemble prediction: (n_samples, n_models) @ (n_models,)"""
+        predictions = np.column_stack([predictions_dict[name] for name in self.models])
+        return predictions @ self._w_vec
     
     def predict_proba(self, X):
         """Predict probabilities using ensemble"""
-        X_scaled = self.scaler.transform(X)
-        
-        predictions = {}
-        for name, model in self.models.items():
-            predictions[name] = model.predict_proba(X_scaled)[:, 1]
+        X_scaled = self._scale(X)
         
-        return self._ensemble_predict(predictions)
+        predictions = np.column_stack([
+            model.predict_proba(X_scaled)[:, 1] for model in self.models.values()
+        ])
+        return predictions @ self._w_vec
+    
+    def predict_with_proba(self, X):
+        """Class labels and probabilities from a single ensemble pass"""
+        proba = self.predict_proba(X)
+        return (proba > 0.5).astype(int), proba
     
     def predict(self, X):
         """Predict class labels"""
-        proba = self.predict_proba(X)
-        return (proba > 0.5).astype(int)
+        return self.predict_with_proba(X)[0]
     
     def save(self, output_dir):
         """Save all models and scaler"""
@@ -260,11 +425,11 @@ class EnsembleVoiceClassifier:
             ensemble.models[name] = joblib.load(model_dir / f"{name}.pkl")
         
         # Load scaler
-        ensemble.scaler = joblib.load(model_dir / "scaler.pkl")
+        ensemble._set_scaler(joblib.load(model_dir / "scaler.pkl"))
         
         # Load weights
         with open(model_dir / "weights.json", 'r') as f:
-            ensemble.weights = json.load(f)
+            ensemble._set_weights(json.load(f))
         
         logger.info(f"Models loaded from {model_dir}")
         return ensemble
@@ -297,8 +462,7 @@ def train_pipeline(data_dir, output_dir):
     ensemble.train(X_train, y_train, X_val, y_val)
     
     # Final evaluation
-    y_pred = ensemble.predict(X_test)
-    y_pred_proba = ensemble.predict_proba(X_test)
+    y_pred, y_pred_proba = ensemble.predict_with_proba(X_test)
     
     logger.info("\nTest Set Results:")
     logger.info(classification_report(y_test, y_pred, 